@@ -0,0 +1,219 @@
+import heapq
+import threading
+from collections import deque
+
+# NumPy and SciPy are imported on first use by _load_numeric, since they make up most of
+# the server's import time. Either may be missing; there are pure-Python fallbacks below.
+np = None
+coo_matrix = None
+connected_components = None
+_numeric_loaded = False
+
+
+def _load_numeric():
+    global np, coo_matrix, connected_components, _numeric_loaded
+    if _numeric_loaded:
+        return
+    try:
+        import numpy
+        np = numpy
+    except ImportError:
+        pass
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+    except ImportError:
+        pass
+    _numeric_loaded = True
+
+
+class GraphAnalytics:
+    """Centrality, components and paths over the graph store.
+
+    Results are cached until the store's version changes, so repeated queries
+    against an unchanged graph are answered from memory. The whole-graph
+    computations work on the store's edge arrays: vectorized with NumPy (and
+    SciPy for components) when they are installed, in plain Python otherwise.
+    """
+
+    def __init__(self, graph_store):
+        self.graph_store = graph_store
+        self._lock = threading.Lock()
+        self._version = None
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        with self._lock:
+            if self._version != self.graph_store.version:
+                self._version = self.graph_store.version
+                self._cache.clear()
+            if key in self._cache:
+                return self._cache[key]
+            version = self._version
+        result = compute()
+        with self._lock:
+            if self._version == version:
+                self._cache[key] = result
+        return result
+
+    def _edges(self):
+        """Node ids plus link endpoints as positions into them (links to unknown ids dropped)."""
+        return self._cached("edges", self._build_edges)
+
+    def _build_edges(self):
+        _load_numeric()
+        _, ids, sources, targets = self.graph_store.edge_arrays()
+        if np is not None:
+            ids = np.unique(np.frombuffer(ids, dtype=np.intc))
+            sources = np.frombuffer(sources, dtype=np.intc)
+            targets = np.frombuffer(targets, dtype=np.intc)
+            if not len(ids):
+                return ids, sources[:0].astype(np.intp), targets[:0].astype(np.intp)
+            source_positions = np.searchsorted(ids, sources)
+            target_positions = np.searchsorted(ids, targets)
+            known = (ids[np.minimum(source_positions, len(ids) - 1)] == sources) & \
+                    (ids[np.minimum(target_positions, len(ids) - 1)] == targets)
+            return ids, source_positions[known], target_positions[known]
+
+        ids = list(dict.fromkeys(ids))
+        position = {node_id: index for index, node_id in enumerate(ids)}
+        pairs = [(position[s], position[t]) for s, t in zip(sources, targets) if s in position and t in position]
+        return ids, [s for s, _ in pairs], [t for _, t in pairs]
+
+    # ------------------------------------------------------------------
+    # Whole-graph measures
+    # ------------------------------------------------------------------
+
+    def pagerank(self, damping=0.85, tol=1e-6, max_iter=100):
+        """Return {node id: PageRank score}. Scores sum to 1."""
+        return self._cached(("pagerank", damping, tol, max_iter),
+                            lambda: self._pagerank(damping, tol, max_iter))
+
+    def _pagerank(self, damping, tol, max_iter):
+        ids, sources, targets = self._edges()
+        n = len(ids)
+        if n == 0:
+            return {}
+
+        if np is not None:
+            out_degree = np.bincount(sources, minlength=n).astype(float)
+            dangling = out_degree == 0
+            weights = 1.0 / out_degree[sources]
+            rank = np.full(n, 1.0 / n)
+            for _ in range(max_iter):
+                spread = np.bincount(targets, weights=rank[sources] * weights, minlength=n)
+                new_rank = (1 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+                converged = np.abs(new_rank - rank).sum() < tol
+                rank = new_rank
+                if converged:
+                    break
+            return dict(zip(ids.tolist(), rank.tolist()))
+
+        out_degree = [0] * n
+        for source in sources:
+            out_degree[source] += 1
+        rank = [1.0 / n] * n
+        for _ in range(max_iter):
+            spread = [0.0] * n
+            for source, target in zip(sources, targets):
+                spread[target] += rank[source] / out_degree[source]
+            dangling = sum(rank[i] for i in range(n) if out_degree[i] == 0)
+            new_rank = [(1 - damping) / n + damping * (spread[i] + dangling / n) for i in range(n)]
+            converged = sum(abs(a - b) for a, b in zip(new_rank, rank)) < tol
+            rank = new_rank
+            if converged:
+                break
+        return dict(zip(ids, rank))
+
+    def degrees(self):
+        """Return {node id: number of links to or from it}."""
+        return self._cached("degrees", self._degrees)
+
+    def _degrees(self):
+        ids, sources, targets = self._edges()
+        if np is not None:
+            n = len(ids)
+            degree = np.bincount(sources, minlength=n) + np.bincount(targets, minlength=n)
+            return dict(zip(ids.tolist(), degree.tolist()))
+        degree = [0] * len(ids)
+        for source, target in zip(sources, targets):
+            degree[source] += 1
+            degree[target] += 1
+        return dict(zip(ids, degree))
+
+    def degree_centrality(self):
+        """Return {node id: degree / (number of nodes - 1)}."""
+        def compute():
+            degrees = self.degrees()
+            scale = 1.0 / max(len(degrees) - 1, 1)
+            return {node_id: degree * scale for node_id, degree in degrees.items()}
+        return self._cached("degree_centrality", compute)
+
+    def components(self):
+        """Weakly connected components as lists of node ids, largest first."""
+        return self._cached("components", self._components)
+
+    def _components(self):
+        _load_numeric()
+        ids, sources, targets = self._edges()
+        n = len(ids)
+        if coo_matrix is not None and n:
+            adjacency = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+            _, labels = connected_components(adjacency, directed=True, connection="weak")
+            labels = labels.tolist()
+        else:
+            labels = _union_find_labels(n, sources, targets)
+
+        ids = ids.tolist() if np is not None else ids
+        groups = {}
+        for node_id, label in zip(ids, labels):
+            groups.setdefault(label, []).append(node_id)
+        return sorted(groups.values(), key=len, reverse=True)
+
+    def top(self, scores, n):
+        """The ``n`` (node id, score) pairs with the highest scores."""
+        return heapq.nlargest(n, scores.items(), key=lambda item: item[1])
+
+    # ------------------------------------------------------------------
+    # Paths
+    # ------------------------------------------------------------------
+
+    def shortest_path(self, source_id, target_id):
+        """Node ids on a shortest path between two nodes, following links either way.
+
+        Returns None if they aren't connected.
+        """
+        return self._cached(("path", source_id, target_id), lambda: self._shortest_path(source_id, target_id))
+
+    def _shortest_path(self, source_id, target_id):
+        parents = {source_id: None}
+        queue = deque([source_id])
+        while queue:
+            current = queue.popleft()
+            if current == target_id:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = parents[current]
+                return path[::-1]
+            for neighbor in self.graph_store.neighbors(current):
+                if neighbor not in parents and self.graph_store.has_node(neighbor):
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+        return None
+
+
+def _union_find_labels(n, sources, targets):
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for source, target in zip(sources, targets):
+        a, b = find(source), find(target)
+        if a != b:
+            parent[a] = b
+    return [find(i) for i in range(n)]
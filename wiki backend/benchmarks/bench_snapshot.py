@@ -0,0 +1,78 @@
+"""Compare graph.json against the binary snapshot: file size, save time, load time and store cold start.
+
+    python benchmarks/bench_snapshot.py [--nodes 100000] [--degree 10]
+
+Prints one JSON object with the results.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph_snapshot import load_snapshot, write_snapshot
+from graph_store import GraphStore
+from my_custom_tools.atomic_io import atomic_write_json
+
+
+def synthetic_graph(node_count, degree, seed=0):
+    rng = random.Random(seed)
+    nodes = [{"id": i, "name": f"Article {i}"} for i in range(1, node_count + 1)]
+    for node in nodes[::20]:
+        node["type"] = "topic"
+    links = []
+    for source in range(1, node_count + 1, degree):
+        for target in rng.sample(range(1, node_count + 1), min(degree * degree, node_count)):
+            if target != source:
+                links.append({"source": source, "target": target, "label": ""})
+    return nodes, links
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--degree", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    nodes, links = synthetic_graph(args.nodes, args.degree)
+    results = {"nodes": len(nodes), "links": len(links)}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "graph.json")
+        bin_path = os.path.join(tmp, "graph.bin")
+
+        def load_json():
+            with open(json_path) as f:
+                json.load(f)
+
+        results["json"] = {
+            "save_s": timed(lambda: atomic_write_json(json_path, {"nodes": nodes, "links": links}), args.repeat),
+            "load_s": timed(load_json, args.repeat),
+            "store_start_s": timed(lambda: GraphStore(json_path), args.repeat),
+            "bytes": os.path.getsize(json_path),
+        }
+        results["binary"] = {
+            "save_s": timed(lambda: write_snapshot(bin_path, nodes, links), args.repeat),
+            "load_s": timed(lambda: load_snapshot(bin_path), args.repeat),
+            "store_start_s": timed(lambda: GraphStore(bin_path), args.repeat),
+            "bytes": os.path.getsize(bin_path),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Import-time budget for the server and the tools registry.
+
+    python benchmarks/bench_startup.py [--budget 3.0] [--repeat 3]
+
+Each module is imported in a fresh interpreter (best of --repeat runs, with
+the graph store pointed at an empty temporary directory). Prints one JSON
+object with the import times, the slowest imports from ``-X importtime`` and
+any heavy dependency that was imported eagerly. Exits with status 1 if an
+import takes longer than --budget seconds or pulls in one of HEAVY_MODULES.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose import cost is measured
+MODULES = ("my_custom_tools.registry", "server")
+# Only imported when a request needs them
+HEAVY_MODULES = ("pandas", "numpy", "scipy")
+# Number of slowest imports reported per module
+TOP_IMPORTS = 10
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def import_once(module, env, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", PROBE.format(module=module, heavy=HEAVY_MODULES)]
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(importtime_output, n):
+    """{module: cumulative ms} for the ``n`` slowest imports in ``-X importtime`` output."""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return {name: microseconds / 1000 for microseconds, name in rows[:n]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=3.0, help="Allowed import time per module in seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="wiki-startup-")
+    env = dict(os.environ,
+               GRAPH_SNAPSHOT_PATH=os.path.join(workdir, "graph.bin"),
+               GRAPH_JSON_PATH=os.path.join(workdir, "graph.json"),
+               WIKI_CACHE_PATH=os.path.join(workdir, "cache.sqlite3"))
+
+    results = {}
+    failed = False
+    for module in MODULES:
+        runs = [import_once(module, env)[0] for _ in range(args.repeat)]
+        _, importtime = import_once(module, env, importtime=True)
+        seconds = min(run["seconds"] for run in runs)
+        heavy = sorted(set().union(*(run["heavy"] for run in runs)))
+        results[module] = {
+            "seconds": seconds,
+            "budget": args.budget,
+            "eager_heavy_imports": heavy,
+            "slowest_imports_ms": slowest_imports(importtime, TOP_IMPORTS),
+        }
+        failed = failed or seconds > args.budget or bool(heavy)
+
+    print(json.dumps(results, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Offline benchmarks for the graph pipeline.
+
+    python benchmarks/run_benchmarks.py [--sizes 1000,10000,100000,1000000] [--only links,filter,...]
+                                        [--fixtures DIR] [--output results.json]
+                                        [--compare baseline.json] [--tolerance 0.25]
+
+Wikipedia is replaced by the local stub in wiki_stub.py (synthetic pages, or
+recorded ones with --fixtures), and the page cache, graph files and Portia
+storage all live in a temporary directory, so runs need no network and leave
+the checkout untouched.
+
+Benchmarks, each run at every graph size (in links):
+
+    links      WikipediaLinksTool against the stub, cold and then cached
+    filter     LinkFilterTool over a list of ``size`` titles
+    merge      TextToJsonTool's merge, the graph store's bulk merge and the tool itself
+    snapshot   graph store load and save
+    endpoints  Flask endpoints through the test client
+
+Results are printed (or written to --output) as JSON: one record per benchmark
+and size with ops, seconds, throughput (items per second), p50/p99 latency in
+ms and peak traced memory in bytes. With --compare, any result whose p50 is
+more than --tolerance slower than in the baseline is reported and the exit
+status is 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from wiki_stub import FixturePages, SyntheticPages, api_url_for, start_stub
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+BENCHMARKS = ("links", "filter", "merge", "snapshot", "endpoints")
+# Links per article in generated pages and graphs
+DEGREE = 50
+# Upper bound on HTTP round trips per links benchmark, so large sizes stay quick
+MAX_TOOL_CALLS = 500
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, size, fn, ops=1, items_per_op=1, setup=None):
+    """Time ``ops`` calls of ``fn(i)``, then trace the memory of one more call."""
+    if setup is not None:
+        setup()
+    latencies = []
+    for i in range(ops):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn(0)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    result = {
+        "name": name,
+        "size": size,
+        "ops": ops,
+        "seconds": total,
+        "throughput": ops * items_per_op / total if total else None,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_memory_bytes": peak,
+    }
+    print(f"{name:<28} size={size:<8} p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms", file=sys.stderr)
+    return result
+
+
+def article_pairs(edges, seed=0):
+    """(title, linked titles) pairs adding up to about ``edges`` links."""
+    rng = random.Random(seed)
+    articles = max(1, edges // DEGREE)
+    universe = max(articles * 4, DEGREE * 2)
+    return [
+        (f"Article {i}", [f"Article {rng.randrange(universe)}" for _ in range(DEGREE)])
+        for i in range(articles)
+    ]
+
+
+def build_graph(edges, seed=0):
+    """A graph.json-style dict with about ``edges`` links."""
+    from my_custom_tools.text_to_json_tool import merge_many_article_links
+    return merge_many_article_links({"nodes": [], "links": []}, article_pairs(edges, seed))
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+def bench_links(size, workdir, pages):
+    from my_custom_tools import page_cache, titles as title_index
+    from my_custom_tools.wikipedia_links_tool import WikipediaLinksTool
+
+    tool = WikipediaLinksTool()
+    titles = pages.titles()[:max(1, min(MAX_TOOL_CALLS, size // DEGREE))]
+    links_per_call = max(1, sum(len(pages.get(title)["links"]) for title in titles) // len(titles))
+
+    def fresh_cache():
+        os.environ["WIKI_CACHE_PATH"] = os.path.join(workdir, f"cache-{size}-{time.time_ns()}.sqlite3")
+        page_cache._page_cache = None
+        title_index._title_index = None
+
+    # A stub that doesn't answer the tool's query would make the timings meaningless
+    fresh_cache()
+    expected = sorted(set(pages.get(titles[0])["links"]))
+    if tool.run(None, titles[0]) != expected:
+        raise RuntimeError(f"The links tool didn't return the stub's {len(expected)} links for {titles[0]}")
+
+    results = [measure("links_tool_cold", size, lambda i: tool.run(None, titles[i]), ops=len(titles),
+                       items_per_op=links_per_call, setup=fresh_cache)]
+    results.append(measure("links_tool_cached", size, lambda i: tool.run(None, titles[i]), ops=len(titles),
+                           items_per_op=links_per_call, setup=lambda: [tool.run(None, title) for title in titles]))
+    return results
+
+
+def bench_filter(size, workdir, pages):
+    from my_custom_tools.link_filter_tool import LinkFilterTool
+
+    tool = LinkFilterTool()
+    rng = random.Random(size)
+    words = ["History", "Science", "of", "the", "Theory", "Art", "List", "2001", "Category:Stub", "Philosophy"]
+    links = [" ".join(rng.choice(words) for _ in range(3)) for _ in range(size)]
+    return [measure("link_filter_tool", size, lambda i: tool.run(None, "Philosophy", links=links), ops=5,
+                    items_per_op=size)]
+
+
+def bench_merge(size, workdir, pages):
+    from graph_store import GraphStore
+    from my_custom_tools.text_to_json_tool import TextToJsonTool, merge_many_article_links, use_graph_store
+
+    pairs = article_pairs(size)
+    results = [measure("text_to_json_merge", size,
+                       lambda i: merge_many_article_links({"nodes": [], "links": []}, pairs), ops=3,
+                       items_per_op=size)]
+
+    stores = []
+
+    def fresh_store():
+        stores.append(GraphStore(os.path.join(workdir, f"merge-{size}-{len(stores)}.bin")))
+
+    results.append(measure("store_bulk_merge", size, lambda i: stores[-1].merge_many_article_links(pairs),
+                           items_per_op=size, setup=fresh_store))
+
+    # The tool as Portia calls it, adding one article to a graph of ``size`` links
+    store = stores[-1]
+    use_graph_store(store)
+    extra = article_pairs(DEGREE * 20, seed=1)
+    tool = TextToJsonTool()
+    try:
+        results.append(measure("text_to_json_tool", size,
+                               lambda i: tool.run(None, f"Extra {i}", links=extra[i % len(extra)][1]),
+                               ops=5, items_per_op=DEGREE))
+    finally:
+        use_graph_store(None)
+        for store in stores:
+            store.close()
+    return results
+
+
+def bench_snapshot(size, workdir, pages):
+    from graph_snapshot import write_snapshot
+    from graph_store import GraphStore
+    from my_custom_tools.atomic_io import atomic_write_json
+
+    graph = build_graph(size)
+    bin_path = os.path.join(workdir, f"snapshot-{size}.bin")
+    json_path = os.path.join(workdir, f"snapshot-{size}.json")
+    write_snapshot(bin_path, graph["nodes"], graph["links"])
+    atomic_write_json(json_path, graph)
+
+    store = GraphStore(bin_path)
+    results = [
+        measure("graph_load_binary", size, lambda i: GraphStore(bin_path).close(), ops=3, items_per_op=size),
+        measure("graph_load_json", size, lambda i: GraphStore(json_path).close(), ops=3, items_per_op=size),
+        measure("graph_save_binary", size, lambda i: store.compact(), ops=3, items_per_op=size),
+        measure("graph_export_json", size, lambda i: store.export_json(json_path), ops=3, items_per_op=size),
+    ]
+    store.close()
+    return results
+
+
+_server = None
+
+
+def bench_endpoints(size, workdir, pages):
+    global _server
+    from graph_snapshot import write_snapshot
+
+    graph = build_graph(size)
+    write_snapshot(os.environ["GRAPH_SNAPSHOT_PATH"], graph["nodes"], graph["links"])
+    if _server is None:
+        import server
+        _server = server
+    _server.graph_store.load()
+    client = _server.app.test_client()
+    name = graph["nodes"][0]["name"]
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    results = []
+    for label, url in (
+        ("get_graph", "/api/get-graph"),
+        ("graph_top", "/api/graph/top?n=50"),
+        ("graph_neighborhood", f"/api/graph/neighborhood?name={name}&hops=2&limit=500"),
+        ("graph_nodes_page", "/api/graph/nodes?limit=1000"),
+        ("analytics_pagerank", "/api/analytics/pagerank?n=50"),
+    ):
+        results.append(measure(f"endpoint_{label}", size, lambda i, url=url: get(url), ops=20))
+
+    def add_node(i):
+        response = client.post("/api/add-node", json={"topic": f"Bench topic {size} {i} {time.time_ns()}",
+                                                      "since": _server.graph_store.version})
+        assert response.status_code == 200, response.status_code
+
+    results.append(measure("endpoint_add_node", size, add_node, ops=20))
+    return results
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, "r") as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["name"], result["size"]))
+        if before and before["p50_ms"] and result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append({"name": result["name"], "size": result["size"],
+                                "baseline_p50_ms": before["p50_ms"], "p50_ms": result["p50_ms"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the graph pipeline")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated graph sizes in links")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated benchmarks to run")
+    parser.add_argument("--fixtures", help="Serve recorded pages from this directory instead of synthetic ones")
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    parser.add_argument("--compare", help="Baseline results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown against the baseline")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    selected = args.only.split(",")
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    pages = FixturePages(args.fixtures) if args.fixtures else SyntheticPages(count=20000, degree=DEGREE)
+    stub = start_stub(pages)
+    workdir = tempfile.mkdtemp(prefix="wiki-bench-")
+    os.environ.update({
+        "WIKIPEDIA_API_URL": api_url_for(stub),
+        "WIKI_CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "WIKI_REQUESTS_PER_SECOND": "1000000",
+        "GRAPH_SNAPSHOT_PATH": os.path.join(workdir, "graph.bin"),
+        "GRAPH_JSON_PATH": os.path.join(workdir, "graph.json"),
+    })
+    os.chdir(workdir)
+
+    runners = {"links": bench_links, "filter": bench_filter, "merge": bench_merge,
+               "snapshot": bench_snapshot, "endpoints": bench_endpoints}
+    results = []
+    for size in sizes:
+        for name in BENCHMARKS:
+            if name in selected:
+                results.extend(runners[name](size, workdir, pages))
+
+    report = {
+        "python": sys.version.split()[0],
+        "timestamp": time.time(),
+        "pages": "fixtures" if args.fixtures else "synthetic",
+        "results": results,
+    }
+    if args.compare:
+        report["regressions"] = compare(results, args.compare, args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    stub.shutdown()
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Local stand-in for the MediaWiki API, so benchmarks never touch the network.
+
+Pages come from a fixture directory of recorded responses (one JSON file per
+article: {"title", "links", "extract"}, or {"title", "redirect"} for a
+redirect) or, without one, are generated deterministically: "Article <n>"
+links to ``degree`` other articles.
+
+Only the queries the tools make are supported: prop=links and
+generator=links (with continuation and redirects=1) and prop=extracts|info,
+for one or more titles.
+
+    python benchmarks/wiki_stub.py serve [--fixtures DIR] [--port 8765]
+    python benchmarks/wiki_stub.py record --fixtures DIR "Philosophy" "Graph theory" ...
+
+``record`` fetches the given articles from Wikipedia through the tools' HTTP
+client and saves them as fixtures.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Links per response page, like MediaWiki's pllimit=max for normal clients
+LINKS_PER_RESPONSE = 500
+
+
+class FixturePages:
+    """Recorded pages loaded from a fixture directory."""
+
+    def __init__(self, directory):
+        self.pages = {}
+        for path in Path(directory).glob("*.json"):
+            with path.open("r", encoding="utf-8") as f:
+                page = json.load(f)
+            self.pages[page["title"]] = page
+
+    def get(self, title):
+        return self.pages.get(title)
+
+    def titles(self):
+        return list(self.pages)
+
+
+class SyntheticPages:
+    """Deterministic generated pages: ``count`` articles with ``degree`` links each."""
+
+    def __init__(self, count=10000, degree=50, seed=0):
+        self.count = count
+        self.degree = degree
+        self.seed = seed
+
+    def get(self, title):
+        if not title.startswith("Article "):
+            return None
+        try:
+            number = int(title[len("Article "):])
+        except ValueError:
+            return None
+        if not 0 <= number < self.count:
+            return None
+        rng = random.Random(self.seed * 1_000_003 + number)
+        links = [f"Article {rng.randrange(self.count)}" for _ in range(self.degree)]
+        return {"title": title, "links": links, "extract": f"{title} is a synthetic article."}
+
+    def titles(self):
+        return [f"Article {number}" for number in range(self.count)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one write; separate small writes stall on delayed ACKs
+    wbufsize = -1
+    pages = None
+
+    def log_message(self, *args):
+        pass
+
+    def _resolve(self, title, redirects):
+        """``title``'s page, following a redirect (recorded in ``redirects``) when that is asked for."""
+        page = self.pages.get(title)
+        if page is not None and "redirect" in page and redirects is not None:
+            redirects.append({"from": title, "to": page["redirect"]})
+            title = page["redirect"]
+            page = self.pages.get(title)
+        return title, page
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        generator = query.get("generator") == "links"
+        offset = int(query.get("gplcontinue" if generator else "plcontinue", "0"))
+        wants_links = "links" in query.get("prop", "")
+        results = []
+        normalized = []
+        redirects = [] if "redirects" in query else None
+        generated = []
+        more = False
+        for requested in query.get("titles", "").split("|"):
+            title = requested[:1].upper() + requested[1:]
+            if title != requested:
+                normalized.append({"from": requested, "to": title})
+            title, page = self._resolve(title, redirects)
+            if page is None:
+                if not generator:
+                    results.append({"title": title, "missing": True})
+            elif generator or wants_links:
+                links = page["links"][offset:offset + LINKS_PER_RESPONSE]
+                more = more or offset + LINKS_PER_RESPONSE < len(page["links"])
+                if generator:
+                    generated.extend(links)
+                else:
+                    results.append({"title": title, "links": [{"ns": 0, "title": link} for link in links]})
+            else:
+                results.append({"title": title, "extract": page.get("extract", ""), "lastrevid": 1})
+
+        # Generated pages are the link targets themselves, once each
+        for link in dict.fromkeys(generated):
+            title, page = self._resolve(link, redirects)
+            results.append({"title": title} if page is not None else {"title": title, "missing": True})
+
+        if generator and not results:
+            body = {"batchcomplete": True}  # MediaWiki leaves out "query" when nothing was generated
+        else:
+            body = {"query": {"pages": results, "normalized": normalized}}
+            if redirects:
+                body["query"]["redirects"] = redirects
+        if more:
+            key = "gplcontinue" if generator else "plcontinue"
+            body["continue"] = {key: str(offset + LINKS_PER_RESPONSE), "continue": f"{key}||" if generator else "||"}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub(pages, port=0):
+    """Serve ``pages`` in a background thread. Returns the server; its API URL is ``api_url_for(server)``."""
+    handler = type("StubHandler", (_Handler,), {"pages": pages})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def api_url_for(server):
+    return f"http://127.0.0.1:{server.server_port}/w/api.php"
+
+
+def record(directory, titles):
+    from my_custom_tools.wikipedia_article_reader_tool import fetch_article_text
+    from my_custom_tools.wikipedia_batch_links_tool import _query_links
+
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    links = _query_links(titles, "en")
+    for title in titles:
+        if links[title] is None:
+            print(f"Skipping missing article {title}")
+            continue
+        text = fetch_article_text(title)
+        page = {"title": title, "links": links[title], "extract": text[0] if text else ""}
+        path = Path(directory) / (title.replace("/", "_") + ".json")
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(page, f)
+        print(f"Recorded {title} ({len(links[title])} links)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local MediaWiki API stub")
+    parser.add_argument("command", choices=["serve", "record"])
+    parser.add_argument("titles", nargs="*")
+    parser.add_argument("--fixtures", help="Fixture directory (default: synthetic pages)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        if not args.fixtures or not args.titles:
+            parser.error("record needs --fixtures and at least one title")
+        record(args.fixtures, args.titles)
+        return
+
+    pages = FixturePages(args.fixtures) if args.fixtures else SyntheticPages()
+    server = start_stub(pages, args.port)
+    print(f"Serving {len(pages.titles())} pages at {api_url_for(server)}; set WIKIPEDIA_API_URL to use it")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import sys
+from array import array
+
+from my_custom_tools.titles import title_key
+
+# Language of nodes without a "lang" field, which is every node of graphs from before languages were added
+DEFAULT_LANG = "en"
+# Nodes with more outgoing links than this get a target set, so has_link doesn't scan their adjacency
+HUB_DEGREE = 32
+
+
+def name_key(name, lang=DEFAULT_LANG):
+    """Name index key: nodes are identified by (language, title). "|" can't occur in a title."""
+    key = title_key(name)
+    return key if lang == DEFAULT_LANG else f"{lang}|{key}"
+
+
+class CompactGraph:
+    """Array-backed graph holding the same data as graph.json in far less memory.
+
+    Nodes are stored column-wise: ids in an ``array('i')``, interned names in
+    a list, languages as numbers into a language table, and any other fields
+    (type, description, ...) as a dict only for the nodes that have them.
+    Nodes are found by (language, name); the language is the node's "lang"
+    field, and nodes without one are English. Links are three parallel arrays of source id,
+    target id and label number, with labels kept once in a label table; the
+    rare link with fields beyond source/target/label keeps them in a side
+    table. Adjacency is kept as arrays of neighbor ids (and, for outgoing
+    links, link numbers) per node; hubs with more than ``HUB_DEGREE``
+    outgoing links also get a set of their targets, built on first lookup,
+    so ``has_link`` is O(1) without a set per link.
+
+    That is roughly 25 bytes per link instead of several hundred for a dict per
+    link plus dict/set adjacency. Nodes and links are returned as fresh dicts
+    in the graph.json schema, and ``from_json``/``to_json`` convert losslessly
+    (node ids must be 32-bit integers).
+    """
+
+    def __init__(self):
+        self._ids = array("i")
+        self._names = []
+        self._fields = []  # per node: dict of extra fields or None
+        self._langs = array("H")  # per node: number into _lang_names
+        self._lang_names = [DEFAULT_LANG]
+        self._lang_numbers = {DEFAULT_LANG: 0}
+        self._position = {}  # node id -> position
+        self._by_name = {}  # name_key(name, lang) -> position of the first node with it
+
+        self._sources = array("i")
+        self._targets = array("i")
+        self._labels = array("i")
+        self._label_names = [""]
+        self._label_numbers = {"": 0}
+        self._link_fields = {}  # link index -> extra fields
+        self._out = {}  # node id -> array of target ids
+        self._out_links = {}  # node id -> array of link numbers, parallel to _out
+        self._in = {}  # node id -> array of source ids
+        self._out_sets = {}  # hub node id -> set of target ids, mirrors _out
+
+    @classmethod
+    def from_json(cls, data):
+        graph = cls()
+        for node in data.get("nodes", []):
+            graph.add_node(node)
+        for link in data.get("links", []):
+            graph.add_link(link)
+        return graph
+
+    def to_json(self):
+        return {"nodes": list(self.iter_nodes()), "links": list(self.iter_links())}
+
+    def columns(self):
+        """The node, link and adjacency columns, e.g. to write a snapshot without holding the caller's lock.
+
+        Link columns are copies; adjacency rows are (node id, array, ..., length)
+        tuples sharing the live arrays, which are only ever appended to, so
+        reading the first ``length`` items later is safe. Field dicts are shared
+        too: they are replaced, never mutated.
+        """
+        return {
+            "ids": array("i", self._ids),
+            "names": list(self._names),
+            "fields": list(self._fields),
+            "langs": array("H", self._langs),
+            "lang_names": list(self._lang_names),
+            "sources": array("i", self._sources),
+            "targets": array("i", self._targets),
+            "labels": array("i", self._labels),
+            "label_names": list(self._label_names),
+            "link_fields": dict(self._link_fields),
+            "out_rows": [(node_id, targets, self._out_links[node_id], len(targets))
+                         for node_id, targets in self._out.items()],
+            "in_rows": [(node_id, sources, len(sources)) for node_id, sources in self._in.items()],
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Build a graph from snapshot columns.
+
+        ``columns`` has the keys of ``columns()``, except that the adjacency may
+        be given as ready-made "out", "out_links" and "in" dicts; otherwise it is
+        rebuilt from the links.
+        """
+        graph = cls()
+        graph._ids = columns["ids"]
+        graph._names = columns["names"]
+        graph._fields = columns["fields"]
+        graph._langs = columns["langs"]
+        graph._lang_names = list(columns["lang_names"])
+        graph._lang_numbers = {lang: number for number, lang in enumerate(graph._lang_names)}
+        graph._sources = columns["sources"]
+        graph._targets = columns["targets"]
+        graph._labels = columns["labels"]
+        graph._label_names = list(columns["label_names"])
+        graph._label_numbers = {label: number for number, label in enumerate(graph._label_names)}
+        graph._link_fields = columns["link_fields"]
+
+        # Walk backwards so the first node with an id or name wins, like add_node's setdefault
+        positions = range(len(graph._ids) - 1, -1, -1)
+        graph._position = dict(zip(reversed(graph._ids), positions))
+        lang_names = graph._lang_names
+        by_name = graph._by_name
+        for position, name, lang in zip(positions, reversed(graph._names), reversed(graph._langs)):
+            by_name[title_key(name) if lang == 0 else name_key(name, lang_names[lang])] = position
+
+        if "out" in columns:
+            graph._out, graph._out_links, graph._in = columns["out"], columns["out_links"], columns["in"]
+            return graph
+        for index, (source, target) in enumerate(zip(graph._sources, graph._targets)):
+            graph._add_adjacency(index, source, target)
+        return graph
+
+    # ------------------------------------------------------------------
+    # Nodes
+    # ------------------------------------------------------------------
+
+    def node_count(self):
+        return len(self._ids)
+
+    def add_node(self, node):
+        """Add a node given as a graph.json dict and return its id."""
+        node_id = node["id"]
+        if not isinstance(node_id, int):
+            raise ValueError(f"Node ids must be integers, got {node_id!r}")
+        name = sys.intern(node["name"])
+        fields = {key: value for key, value in node.items() if key not in ("id", "name", "lang")}
+        lang = node.get("lang") or DEFAULT_LANG
+        position = len(self._ids)
+        self._ids.append(node_id)
+        self._names.append(name)
+        self._fields.append(fields or None)
+        self._langs.append(self._lang_number(lang))
+        self._position.setdefault(node_id, position)
+        self._by_name.setdefault(name_key(name, lang), position)
+        return node_id
+
+    def _lang_number(self, lang):
+        number = self._lang_numbers.get(lang)
+        if number is None:
+            number = self._lang_numbers[lang] = len(self._lang_names)
+            self._lang_names.append(lang)
+        return number
+
+    def update_node(self, node_id, fields):
+        position = self._position[node_id]
+        fields = dict(fields)
+        if "name" in fields:
+            self._names[position] = sys.intern(fields.pop("name"))
+        fields.pop("id", None)
+        if "lang" in fields:
+            self._langs[position] = self._lang_number(fields.pop("lang") or DEFAULT_LANG)
+        if fields:
+            # A new dict rather than an update, so copies from columns() aren't changed underneath
+            self._fields[position] = {**(self._fields[position] or {}), **fields}
+
+    def has_node(self, node_id):
+        return node_id in self._position
+
+    def node(self, node_id):
+        """The node with ``node_id`` as a dict, or None."""
+        position = self._position.get(node_id)
+        return None if position is None else self._node_at(position)
+
+    def find(self, name, lang=DEFAULT_LANG):
+        """The node with this name in ``lang`` as a dict, or None.
+
+        Case, underscores and Unicode normalization are ignored.
+        """
+        position = self._by_name.get(name_key(name, lang))
+        return None if position is None else self._node_at(position)
+
+    def node_ids(self):
+        return self._position.keys()
+
+    def max_node_id(self):
+        return max(self._ids, default=0)
+
+    def iter_nodes(self, start=0, stop=None):
+        for position in range(start, len(self._ids) if stop is None else min(stop, len(self._ids))):
+            yield self._node_at(position)
+
+    def _node_at(self, position):
+        node = {"id": self._ids[position], "name": self._names[position]}
+        lang = self._langs[position]
+        if lang:
+            node["lang"] = self._lang_names[lang]
+        fields = self._fields[position]
+        if fields:
+            node.update(fields)
+        return node
+
+    # ------------------------------------------------------------------
+    # Links
+    # ------------------------------------------------------------------
+
+    def link_count(self):
+        return len(self._sources)
+
+    def add_link(self, link):
+        """Add a link given as a graph.json dict, without checking for duplicates."""
+        source, target = link["source"], link["target"]
+        label = link.get("label", "")
+        number = self._label_numbers.get(label)
+        if number is None:
+            number = self._label_numbers[label] = len(self._label_names)
+            self._label_names.append(label)
+        if len(link) != 3 or "label" not in link:
+            fields = {key: value for key, value in link.items() if key not in ("source", "target", "label")}
+            fields["_has_label"] = "label" in link
+            self._link_fields[len(self._sources)] = fields
+
+        self._add_adjacency(len(self._sources), source, target)
+        self._sources.append(source)
+        self._targets.append(target)
+        self._labels.append(number)
+
+    def _add_adjacency(self, index, source, target):
+        out = self._out.get(source)
+        if out is None:
+            out = self._out[source] = array("i")
+            self._out_links[source] = array("i")
+        self._out_links[source].append(index)
+        out.append(target)
+        targets = self._out_sets.get(source)
+        if targets is not None:
+            targets.add(target)
+        incoming = self._in.get(target)
+        if incoming is None:
+            incoming = self._in[target] = array("i")
+        incoming.append(source)
+
+    def has_link(self, source, target):
+        out = self._out.get(source)
+        if out is None:
+            return False
+        if len(out) <= HUB_DEGREE:
+            return target in out
+        targets = self._out_sets.get(source)
+        if targets is None:
+            targets = self._out_sets[source] = set(out)
+        return target in targets
+
+    def targets(self, source):
+        return self._out.get(source, ())
+
+    def sources(self, target):
+        return self._in.get(target, ())
+
+    def degree(self, node_id):
+        return len(self._out.get(node_id, ())) + len(self._in.get(node_id, ()))
+
+    def arrays(self):
+        """Copies of the node id, link source and link target arrays, for bulk processing."""
+        return array("i", self._ids), array("i", self._sources), array("i", self._targets)
+
+    def iter_links(self, start=0, stop=None):
+        for index in range(start, len(self._sources) if stop is None else min(stop, len(self._sources))):
+            yield self._link_at(index)
+
+    def links_between(self, node_ids):
+        """Links whose endpoints are both in ``node_ids``, grouped by source in the given order."""
+        members = set(node_ids)
+        for source in node_ids:
+            seen = set()
+            for target, index in zip(self._out.get(source, ()), self._out_links.get(source, ())):
+                if target in members and target not in seen:
+                    seen.add(target)
+                    yield self._link_at(index)
+
+    def _link_at(self, index):
+        link = {"source": self._sources[index], "target": self._targets[index]}
+        fields = self._link_fields.get(index)
+        if fields is None:
+            link["label"] = self._label_names[self._labels[index]]
+        else:
+            if fields["_has_label"]:
+                link["label"] = self._label_names[self._labels[index]]
+            link.update((key, value) for key, value in fields.items() if key != "_has_label")
+        return link
@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from my_custom_tools.wikipedia_batch_links_tool import fetch_links_batch, MAX_TITLES_PER_QUERY
+from my_custom_tools.wikipedia_langlinks_tool import fetch_langlinks_batch
+from my_custom_tools.link_filter_tool import filter_links
+from my_custom_tools import metrics
+from my_custom_tools.titles import get_title_index, normalize_title
+
+
+def crawl(graph_store, seed, depth=2, max_nodes=500, max_in_flight=8, on_level=None, lang="en", languages=()):
+    """Breadth-first expansion from ``seed`` for up to ``depth`` hops.
+
+    Each level's pages are fetched in batches of 50 titles per MediaWiki
+    query, on a thread pool with at most ``max_in_flight`` batches outstanding
+    (the per-host rate limiter still applies). Titles are deduplicated across
+    the whole crawl, and no more than ``max_nodes`` distinct titles are added.
+    The level's results are merged into ``graph_store`` as soon as the level
+    completes.
+
+    Titles are compared by their canonical title as far as the title index
+    knows it; fetching a page records its redirect, so a redirect that was
+    queued is merged under the article it points to.
+
+    ``seed`` is a title on the ``lang`` Wikipedia. With ``languages``, the
+    seed's interlanguage links start a crawl of each of those editions too.
+    Every language has its own thread pool, so the editions (separate hosts
+    with separate rate limits) are fetched side by side, and pages of
+    different editions that are the same article are linked with the
+    "langlink" label. All languages share the ``max_nodes`` budget.
+
+    Returns one summary dict per level.
+    """
+    titles = get_title_index()
+    languages = [code for code in dict.fromkeys(languages) if code != lang]
+
+    def key(page_lang, title):
+        return page_lang, titles.canonical(title, page_lang) or normalize_title(title)
+
+    seen = {key(lang, seed)}
+    frontier = [(lang, seed)]
+    if languages:
+        for code, title in _fetch_translations([seed], lang, languages)[0].items():
+            if len(seen) < max_nodes and key(code, title) not in seen:
+                seen.add(key(code, title))
+                frontier.append((code, title))
+    # Interlanguage links whose target isn't in the graph yet: (source key, target key)
+    pending_langlinks = []
+    levels = []
+
+    with ExitStack() as stack:
+        pools = {}
+        for level in range(depth):
+            if not frontier:
+                break
+
+            # Submit every language's batches before waiting on any of them
+            by_lang = {}
+            for page_lang, title in frontier:
+                by_lang.setdefault(page_lang, []).append(title)
+            futures = []
+            for page_lang, page_titles in by_lang.items():
+                if page_lang not in pools:
+                    pools[page_lang] = stack.enter_context(ThreadPoolExecutor(max_workers=max_in_flight))
+                for i in range(0, len(page_titles), MAX_TITLES_PER_QUERY):
+                    batch = page_titles[i:i + MAX_TITLES_PER_QUERY]
+                    futures.append((page_lang, batch,
+                                    pools[page_lang].submit(_fetch_related, batch, page_lang),
+                                    pools[page_lang].submit(_fetch_translations, batch, page_lang, languages)
+                                    if languages else None))
+
+            next_frontier = []
+            merged = {}
+            added = 0
+            missing = 0
+            for page_lang, batch, related_future, translations_future in futures:
+                translations = translations_future.result() if translations_future else [{}] * len(batch)
+                for title, related, translated in zip(batch, related_future.result(), translations):
+                    if related is None:
+                        missing += 1
+                        continue
+                    kept = []
+                    for link in related:
+                        link_key = key(page_lang, link)
+                        if link_key in seen:
+                            kept.append(link)
+                        elif len(seen) < max_nodes:
+                            seen.add(link_key)
+                            kept.append(link)
+                            next_frontier.append((page_lang, link))
+                            added += 1
+                    page_key = key(page_lang, title)
+                    merged.setdefault(page_lang, []).append((page_key[1], kept))
+                    pending_langlinks.extend((page_key, key(code, other)) for code, other in translated.items())
+
+            with graph_store.batch():
+                for page_lang, pairs in merged.items():
+                    graph_store.merge_many_article_links(pairs, lang=page_lang)
+                pending_langlinks, linked = _add_langlinks(graph_store, pending_langlinks)
+
+            summary = {
+                "depth": level + 1,
+                "fetched": len(frontier),
+                "missing": missing,
+                "added": added,
+            }
+            if languages:
+                summary["languages"] = {page_lang: len(page_titles) for page_lang, page_titles in by_lang.items()}
+                summary["langlinks"] = linked
+            levels.append(summary)
+            if on_level is not None:
+                on_level(summary)
+            frontier = next_frontier
+
+    return levels
+
+
+def _add_langlinks(graph_store, langlinks):
+    """Link the nodes of each (source key, target key) pair that are both in the graph, once per pair of pages.
+
+    Returns the pairs that aren't in the graph yet and the number of links added.
+    """
+    waiting = []
+    added = 0
+    for source_key, target_key in langlinks:
+        source = graph_store.find_node(source_key[1], source_key[0])
+        target = graph_store.find_node(target_key[1], target_key[0])
+        if source is None or target is None:
+            waiting.append((source_key, target_key))
+        elif (not graph_store.has_link(target["id"], source["id"])
+              and graph_store.add_link(source["id"], target["id"], "langlink")):
+            added += 1
+    return waiting, added
+
+
+def _fetch_related(titles, lang="en"):
+    """Fetch and filter links for a batch of titles, returning None for pages that could not be fetched."""
+    try:
+        links = fetch_links_batch(titles, lang)
+    except Exception as e:
+        print(f"Error fetching links for {len(titles)} titles starting at {titles[0]}: {e}")
+        metrics.inc("errors_total", source="crawler")
+        return [None] * len(titles)
+    return [None if links.get(title) is None else filter_links(title, links[title]) for title in titles]
+
+
+def _fetch_translations(titles, lang, languages):
+    """``{language: title}`` in ``languages`` for each title of a batch; empty where unknown or on errors."""
+    try:
+        langlinks = fetch_langlinks_batch(titles, lang, languages)
+    except Exception as e:
+        print(f"Error fetching language links for {len(titles)} titles starting at {titles[0]}: {e}")
+        metrics.inc("errors_total", source="crawler")
+        return [{}] * len(titles)
+    return [langlinks.get(title) or {} for title in titles]
@@ -0,0 +1,25 @@
+from my_custom_tools.wikipedia_links_tool import fetch_links
+from my_custom_tools.link_filter_tool import filter_links
+from my_custom_tools.titles import canonical_titles
+
+
+def expand_article(graph_store, topic, lang="en"):
+    """Expand a node without going through the LLM planner.
+
+    Runs the same steps the Portia plan would (links tool, link filter, text to
+    json merge) directly in-process, against the ``lang`` Wikipedia. Returns
+    None if the article does not exist.
+    """
+    links = fetch_links(topic, lang)
+    if links is None:
+        return None
+
+    # Links often point at redirects; resolve them so each article becomes one node. fetch_links
+    # already returns canonical titles and records them, so this only queries for cached pages.
+    related = canonical_titles(filter_links(topic, links), lang)
+    main_node = graph_store.merge_article_links(topic, related, lang=lang, type="topic")
+    return {
+        "nodeId": main_node["id"],
+        "summary": f"{topic} links to {len(related)} related articles.",
+        "links": related,
+    }
@@ -0,0 +1,249 @@
+"""Compact binary snapshot format for the graph store.
+
+Layout (little-endian, every section starts on an 8-byte boundary):
+
+    magic           8 bytes  b"WKGRAPH\\x02"
+    header          10 x u64 nodes, links, strings, string bytes, extra bytes, labels, languages,
+                             out rows, in rows, reserved
+    string_offsets  i64 x (strings + 1)   character offsets into the decoded string blob
+    node_ids        i32 x nodes
+    node_names      i32 x nodes           string index of the node name
+    node_fields     i32 x nodes           string index of the other fields as JSON, -1 if none
+    node_langs      u16 x nodes           index into languages
+    languages       i32 x languages       string index of each language code
+    labels          i32 x labels          string index of each link label
+    link_sources    i32 x links           source node id, in the order the links were added
+    link_targets    i32 x links           target node id
+    link_labels     i32 x links           index into labels
+    out_ids         i32 x out rows        nodes with outgoing links
+    out_offsets     i64 x (out rows + 1)  row i is out_targets/out_links[out_offsets[i]:out_offsets[i + 1]]
+    out_targets     i32 x links           target ids, per source node
+    out_links       i32 x links           link numbers, parallel to out_targets
+    in_ids          i32 x in rows         nodes with incoming links
+    in_offsets      i64 x (in rows + 1)
+    in_sources      i32 x links           source ids, per target node
+    strings         UTF-8 blob            all strings concatenated, deduplicated
+    extra           JSON                  fields of links that have more than source/target/label
+
+These are the columns of ``CompactGraph``, adjacency included, so loading
+copies each section into its arrays in one go and only the name and id
+indexes are rebuilt. Names, labels
+and field sets are interned in the string table, so repeated values are
+stored once. Nodes and links keep their order, so a save and load is
+lossless.
+
+Run ``python graph_snapshot.py in out`` to convert between .json and .bin.
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from compact_graph import CompactGraph
+from my_custom_tools.atomic_io import atomic_writer
+
+MAGIC = b"WKGRAPH\x02"
+_HEADER = struct.Struct("<10Q")
+
+
+def is_binary_snapshot(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class _Strings:
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def add(self, value):
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+
+def write_snapshot(path, nodes, links):
+    """Write ``nodes`` and ``links`` (iterables of graph.json-style dicts) to ``path`` atomically.
+
+    Node ids must be 32-bit integers; raises ValueError otherwise.
+    """
+    write_columns(path, CompactGraph.from_json({"nodes": nodes, "links": links}).columns())
+
+
+def write_columns(path, columns):
+    """Write ``CompactGraph.columns()`` to ``path`` atomically."""
+    strings = _Strings()
+    node_names = array("i", [strings.add(name) for name in columns["names"]])
+    encoded_fields = {}
+    node_fields = array("i")
+    for fields in columns["fields"]:
+        if not fields:
+            node_fields.append(-1)
+            continue
+        # Loaded nodes share one dict per distinct field set; keeping the dict alive keeps its id unique
+        cached = encoded_fields.get(id(fields))
+        if cached is None:
+            cached = encoded_fields[id(fields)] = (fields, strings.add(json.dumps(fields, sort_keys=True)))
+        node_fields.append(cached[1])
+    languages = array("i", [strings.add(lang) for lang in columns["lang_names"]])
+    labels = array("i", [strings.add(label) for label in columns["label_names"]])
+
+    string_offsets = array("q", [0])
+    for value in strings.values:
+        string_offsets.append(string_offsets[-1] + len(value))
+    blob = "".join(strings.values).encode("utf-8")
+    link_fields = columns["link_fields"]
+    extra = json.dumps({"link_fields": {str(index): fields for index, fields in link_fields.items()}}
+                       ).encode("utf-8") if link_fields else b""
+
+    out_ids, out_offsets, out_targets, out_links = array("i"), array("q", [0]), array("i"), array("i")
+    for node_id, targets, links, length in columns["out_rows"]:
+        out_ids.append(node_id)
+        out_targets.extend(targets[:length])
+        out_links.extend(links[:length])
+        out_offsets.append(len(out_targets))
+    in_ids, in_offsets, in_sources = array("i"), array("q", [0]), array("i")
+    for node_id, sources, length in columns["in_rows"]:
+        in_ids.append(node_id)
+        in_sources.extend(sources[:length])
+        in_offsets.append(len(in_sources))
+
+    sections = [string_offsets, columns["ids"], node_names, node_fields, columns["langs"], languages, labels,
+                columns["sources"], columns["targets"], columns["labels"],
+                out_ids, out_offsets, out_targets, out_links, in_ids, in_offsets, in_sources]
+    if sys.byteorder != "little":
+        sections = [array(section.typecode, section) for section in sections]
+        for section in sections:
+            section.byteswap()
+
+    with atomic_writer(path) as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(columns["ids"]), len(columns["sources"]), len(strings.values), len(blob),
+                             len(extra), len(labels), len(languages), len(out_ids), len(in_ids), 0))
+        for section in sections:
+            f.write(section.tobytes())
+            _pad(f)
+        f.write(blob)
+        _pad(f)
+        f.write(extra)
+
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def read_snapshot(path):
+    """Read a snapshot written by ``write_snapshot`` into a ``CompactGraph``."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a binary graph snapshot")
+        (node_count, link_count, string_count, blob_size, extra_size,
+         label_count, language_count, out_count, in_count, _) = _HEADER.unpack_from(data, len(MAGIC))
+        reader = _SectionReader(data, len(MAGIC) + _HEADER.size)
+        string_offsets = reader.array("q", string_count + 1)
+        node_ids = reader.array("i", node_count)
+        node_names = reader.array("i", node_count)
+        node_fields = reader.array("i", node_count)
+        node_langs = reader.array("H", node_count)
+        languages = reader.array("i", language_count)
+        labels = reader.array("i", label_count)
+        link_sources = reader.array("i", link_count)
+        link_targets = reader.array("i", link_count)
+        link_labels = reader.array("i", link_count)
+        out_ids = reader.array("i", out_count)
+        out_offsets = reader.array("q", out_count + 1)
+        out_targets = reader.array("i", link_count)
+        out_links = reader.array("i", link_count)
+        in_ids = reader.array("i", in_count)
+        in_offsets = reader.array("q", in_count + 1)
+        in_sources = reader.array("i", link_count)
+        text = reader.bytes(blob_size).decode("utf-8")
+        extra = reader.bytes(extra_size)
+        reader.close()  # The mapping can't be closed while views into it exist
+
+    strings = [text[start:end] for start, end in zip(string_offsets, string_offsets[1:])]
+    decoded_fields = {-1: None}
+    for number in set(node_fields):
+        if number not in decoded_fields:
+            decoded_fields[number] = json.loads(strings[number])
+    link_fields = json.loads(extra)["link_fields"] if extra else {}
+    out_rows = list(zip(out_ids, out_offsets, out_offsets[1:]))
+    in_rows = list(zip(in_ids, in_offsets, in_offsets[1:]))
+    return CompactGraph.from_columns({
+        "ids": node_ids,
+        "names": [strings[number] for number in node_names],
+        "fields": [decoded_fields[number] for number in node_fields],
+        "langs": node_langs,
+        "lang_names": [strings[number] for number in languages],
+        "sources": link_sources,
+        "targets": link_targets,
+        "labels": link_labels,
+        "label_names": [strings[number] for number in labels],
+        "link_fields": {int(index): fields for index, fields in link_fields.items()},
+        "out": {node_id: out_targets[start:end] for node_id, start, end in out_rows},
+        "out_links": {node_id: out_links[start:end] for node_id, start, end in out_rows},
+        "in": {node_id: in_sources[start:end] for node_id, start, end in in_rows},
+    })
+
+
+def load_snapshot(path):
+    """Read a snapshot written by ``write_snapshot`` and return (nodes, links) as graph.json dicts."""
+    graph = read_snapshot(path)
+    return list(graph.iter_nodes()), list(graph.iter_links())
+
+
+class _SectionReader:
+    """Reads consecutive 8-byte aligned sections out of the mapped file as arrays."""
+
+    def __init__(self, data, offset):
+        self._view = memoryview(data)
+        self._offset = offset
+
+    def array(self, typecode, count):
+        values = array(typecode)
+        size = values.itemsize * count
+        section = self._view[self._offset:self._offset + size]
+        self._offset += size + (-size % 8)
+        values.frombytes(section)
+        section.release()
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def bytes(self, size):
+        section = self._view[self._offset:self._offset + size]
+        self._offset += size + (-size % 8)
+        value = section.tobytes()
+        section.release()
+        return value
+
+    def close(self):
+        self._view.release()
+
+
+def load_any(path):
+    """Load (nodes, links) from either a binary snapshot or a graph.json file."""
+    if is_binary_snapshot(path):
+        return load_snapshot(path)
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data.get("nodes", []), data.get("links", [])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python graph_snapshot.py <input .json|.bin> <output .json|.bin>")
+    nodes, links = load_any(sys.argv[1])
+    if sys.argv[2].endswith(".json"):
+        from my_custom_tools.atomic_io import atomic_write_json
+        atomic_write_json(sys.argv[2], {"nodes": nodes, "links": links})
+    else:
+        write_snapshot(sys.argv[2], nodes, links)
+    print(f"Wrote {len(nodes)} nodes and {len(links)} links to {sys.argv[2]}")
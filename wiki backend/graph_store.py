@@ -0,0 +1,655 @@
+import json
+import os
+import heapq
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from compact_graph import DEFAULT_LANG, CompactGraph
+from graph_snapshot import is_binary_snapshot, load_any, read_snapshot, write_columns
+from my_custom_tools import metrics
+from my_custom_tools.atomic_io import atomic_write_json
+
+
+def _coerce_id(value):
+    """Convert string IDs (e.g. from a query string) to integers.
+
+    Strings that aren't numbers are returned unchanged, so looking them up
+    finds no node instead of raising.
+    """
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _end_torn_line(path):
+    """Make a log end with a newline so that appends start on a line of their own.
+
+    A final line without one was cut short by a crash and is dropped, unless
+    it happens to be a whole entry.
+    """
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        start = size
+        while start > 0:
+            step = min(1 << 16, start)
+            f.seek(start - step)
+            newline = f.read(step).rfind(b"\n")
+            start -= step
+            if newline != -1:
+                start += newline + 1
+                break
+        f.seek(start)
+        try:
+            json.loads(f.read())
+        except ValueError:
+            f.truncate(start)
+        else:
+            f.write(b"\n")
+
+
+def _is_node_id(value):
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 31 <= value < 2 ** 31
+
+
+def _remap_ids(nodes, links):
+    """Give nodes whose id isn't a 32-bit integer a new id and point their links at it.
+
+    The store only holds integer ids (see ``CompactGraph``); graphs imported
+    from graph.json may still have ids like "a". Links whose endpoints can't
+    be mapped to an integer are dropped. Both are reported.
+    """
+    ids = [_coerce_id(node["id"]) for node in nodes]
+    next_id = max((node_id for node_id in ids if _is_node_id(node_id)), default=0) + 1
+    remap = {}
+    for node, node_id in zip(nodes, ids):
+        if not _is_node_id(node_id):
+            key = repr(node_id)
+            if key not in remap:
+                remap[key] = next_id
+                next_id += 1
+            node_id = remap[key]
+        node["id"] = node_id
+    if remap:
+        print(f"Gave {len(remap)} nodes with non-integer ids new ids: "
+              + ", ".join(f"{old} -> {new}" for old, new in list(remap.items())[:10]))
+
+    kept = []
+    for link in links:
+        source, target = _coerce_id(link["source"]), _coerce_id(link["target"])
+        source = source if _is_node_id(source) else remap.get(repr(source))
+        target = target if _is_node_id(target) else remap.get(repr(target))
+        if source is None or target is None:
+            continue
+        link["source"], link["target"] = source, target
+        kept.append(link)
+    if len(kept) < len(links):
+        print(f"Dropped {len(links) - len(kept)} links whose endpoints aren't integer node ids")
+    return nodes, kept
+
+
+class GraphStore:
+    """Process-resident graph that is loaded once and persisted incrementally.
+
+    The full graph lives in memory as a ``CompactGraph`` with a case-folded
+    name index, an id index and adjacency arrays, so reads never touch disk. Every write is
+    appended to a JSON-lines log next to the snapshot. Once the log is larger
+    than ``compact_ratio`` times the snapshot (and ``compact_min_bytes``), a
+    background thread folds it back into the snapshot file, which is replaced
+    atomically; see ``compact``. The store is the only writer of both files.
+
+    Snapshots use the compact binary format from ``graph_snapshot`` unless
+    ``snapshot_path`` ends in ``.json``. If the snapshot doesn't exist yet the
+    graph is imported from ``import_path`` (e.g. an existing graph.json).
+    Node ids are 32-bit integers; imported nodes with other ids get new ones.
+
+    Each write also bumps ``version`` and is kept in a bounded in-memory change
+    log of ``max_changes`` entries, so clients can fetch just what changed.
+
+    With a ``titles`` index (see ``my_custom_tools.titles``), names are matched
+    through known redirects too, so an alias finds the node of its canonical
+    title and new nodes are named by their canonical title.
+
+    Without a ``snapshot_path`` the store holds ``data`` (a graph in the
+    graph.json schema) in memory only and writes nothing, so code working on
+    a plain graph dict can still merge with the store's rules.
+    """
+
+    def __init__(self, snapshot_path=None, log_path=None, compact_ratio=0.5, compact_min_bytes=1 << 20,
+                 max_changes=10000, import_path=None, titles=None, data=None):
+        self.snapshot_path = snapshot_path
+        self.titles = titles
+        self.import_path = import_path
+        self._data = data or {}
+        self.log_path = log_path or (snapshot_path + ".log" if snapshot_path else None)
+        # Log entries being folded into the snapshot by a compaction that hasn't finished (or crashed)
+        self.compacting_path = self.log_path + ".compacting" if self.log_path else None
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.version = 0
+        self._base_version = 0
+        self._changes = deque(maxlen=max_changes)
+
+        # _lock guards the in-memory graph. _flush_cond guards the queue of log lines
+        # waiting to be flushed and is never held while waiting for _lock.
+        self._lock = threading.RLock()
+        self._flush_cond = threading.Condition()
+        self._flushing = False
+        self._queue = []
+        self._queued_seq = 0
+        self._flushed_seq = 0
+        self._batch_depth = 0
+        self._log_file = None
+        self._log_bytes = 0
+        self._snapshot_bytes = 0
+        self._snapshot_mtime = None
+        # Held for the whole of a compaction, so only one runs at a time
+        self._compact_lock = threading.Lock()
+        self._reset()
+        self.load()
+
+    def _reset(self):
+        self._graph = CompactGraph()
+        self._next_id = 1
+
+    # ------------------------------------------------------------------
+    # Loading and persistence
+    # ------------------------------------------------------------------
+
+    @metrics.timed("graph_load")
+    def load(self):
+        """(Re)load the snapshot and replay any pending log entries."""
+        with self._lock, self._log_access():
+            self._close_log()
+            self._reset()
+            if self.snapshot_path is None:
+                nodes, links = self._data.get("nodes", []), self._data.get("links", [])
+            else:
+                nodes, links = self._read_snapshot()
+
+            nodes, links = _remap_ids([dict(node) for node in nodes], [dict(link) for link in links])
+            for node in nodes:
+                self._index_node(node)
+            for link in links:
+                self._index_link(link)
+
+            if self.snapshot_path is not None:
+                if self._snapshot_mtime is None and nodes:
+                    # Imported: save it in the store's own format right away
+                    self._write_snapshot()
+                    self._snapshot_mtime = os.path.getmtime(self.snapshot_path)
+                self._snapshot_bytes = os.path.getsize(self.snapshot_path) if os.path.exists(self.snapshot_path) else 0
+                self._replay_log()
+
+            # Versions start from the load time so that they keep increasing across
+            # restarts and reloads; clients holding an older version get a full snapshot.
+            self.version = max(time.time_ns() // 1000, self.version + 1)
+            self._base_version = self.version
+            self._changes.clear()
+
+    def _read_snapshot(self):
+        """Load the snapshot (or the graph to import) into ``_graph``, or return it as (nodes, links) to index."""
+        nodes, links = [], []
+        try:
+            if os.path.exists(self.snapshot_path):
+                if is_binary_snapshot(self.snapshot_path):
+                    # Straight into the arrays, without a dict per node and link
+                    self._graph = read_snapshot(self.snapshot_path)
+                    self._next_id = max(self._graph.max_node_id(), 0) + 1
+                else:
+                    nodes, links = load_any(self.snapshot_path)
+                self._snapshot_mtime = os.path.getmtime(self.snapshot_path)
+            elif self.import_path and os.path.exists(self.import_path):
+                nodes, links = load_any(self.import_path)
+        except Exception as e:
+            print(f"Error loading graph data: {e}")
+        return nodes, links
+
+    def _replay_log(self):
+        """Apply the log entries written since the snapshot."""
+        self._log_bytes = 0
+        for path in (self.compacting_path, self.log_path):
+            if not os.path.exists(path):
+                continue
+            _end_torn_line(path)
+            self._log_bytes += os.path.getsize(path)
+            with open(path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError) as e:
+                        # A torn final line after a crash is expected; skip it.
+                        print(f"Skipping bad graph log entry: {e}")
+
+    def compact(self):
+        """Write the in-memory graph as a fresh snapshot and drop the log entries it now holds.
+
+        Only copying the graph's columns and moving the log aside happen under
+        the lock; the snapshot is serialized and written while readers and
+        writers carry on, with new writes going to a fresh log. The moved-aside
+        log is replayed on load until the new snapshot is in place, and replay
+        skips entries the snapshot already has, so a crash at any point loses
+        nothing.
+        """
+        if self.snapshot_path is None:
+            return
+        with self._compact_lock:
+            self._compact()
+
+    def _start_compaction(self):
+        """Compact on a background thread unless a compaction is already running."""
+        if not self._compact_lock.locked():
+            threading.Thread(target=self._compact_in_background, name="graph-compact", daemon=True).start()
+
+    def _compact_in_background(self):
+        if not self._compact_lock.acquire(blocking=False):
+            return
+        try:
+            self._compact()
+        except Exception as e:
+            print(f"Error compacting the graph log: {e}")
+            metrics.inc("errors_total", source="graph_compact")
+        finally:
+            self._compact_lock.release()
+
+    @metrics.timed("graph_save")
+    def _compact(self):
+        with self._lock, self._log_access():
+            self._close_log()
+            copy = self._snapshot() if self.snapshot_path.endswith(".json") else self._graph.columns()
+            if os.path.exists(self.log_path):
+                if os.path.exists(self.compacting_path):
+                    # Left over from a compaction that didn't finish: keep its entries too
+                    with open(self.log_path, "r") as src, open(self.compacting_path, "a") as dst:
+                        dst.write(src.read())
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, self.compacting_path)
+            self._log_bytes = 0
+
+        self._write_snapshot(copy)
+        with self._lock:
+            self._snapshot_mtime = os.path.getmtime(self.snapshot_path)
+            self._snapshot_bytes = os.path.getsize(self.snapshot_path)
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+    def _write_snapshot(self, copy=None):
+        """Write ``copy`` (from ``_compact``), or the current graph, as the snapshot."""
+        if self.snapshot_path.endswith(".json"):
+            atomic_write_json(self.snapshot_path, self._snapshot() if copy is None else copy)
+        else:
+            write_columns(self.snapshot_path, self._graph.columns() if copy is None else copy)
+        metrics.inc("bytes_written_total", os.path.getsize(self.snapshot_path), target="graph_snapshot")
+
+    @metrics.timed("graph_export")
+    def export_json(self, path):
+        """Write the graph as graph.json for the frontend."""
+        with self._lock:
+            atomic_write_json(path, self._snapshot())
+        metrics.inc("bytes_written_total", os.path.getsize(path), target="graph_json")
+
+    def close(self):
+        with self._compact_lock, self._lock, self._log_access():
+            self._close_log()
+
+    def _close_log(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    @contextmanager
+    def _log_access(self):
+        """Exclusive access to the log files while ``_lock`` is held.
+
+        Waits for an in-progress flush to finish, then writes the entries still
+        queued, so writers waiting in ``_commit`` only return once their entries
+        are on disk even if the caller moves the log aside or reloads.
+        """
+        with self._flush_cond:
+            while self._flushing:
+                self._flush_cond.wait()
+            self._flushing = True
+            lines, self._queue = self._queue, []
+            flushed = self._queued_seq
+        try:
+            if lines:
+                self._write_log(lines)
+            with self._flush_cond:
+                self._flushed_seq = max(self._flushed_seq, flushed)
+            yield
+        finally:
+            with self._flush_cond:
+                self._flushing = False
+                self._flush_cond.notify_all()
+
+    def _append(self, entry):
+        """Record a write in the change log and queue it for the next log flush."""
+        self.version += 1
+        self._changes.append((self.version, entry))
+        if self.log_path is None:
+            return
+        line = json.dumps(entry) + "\n"
+        with self._flush_cond:
+            self._queue.append(line)
+            self._queued_seq += 1
+
+    @contextmanager
+    def batch(self):
+        """Apply the writes made inside the block atomically and persist them together.
+
+        Every public write method runs inside ``batch``. The log is flushed once
+        the outermost block exits and the lock has been released, so writers
+        that queue entries while a flush is in progress are committed together
+        by the next flush (group commit).
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield
+            finally:
+                self._batch_depth -= 1
+                outermost = self._batch_depth == 0
+                seq = self._queued_seq
+        if outermost:
+            self._commit(seq)
+
+    def _commit(self, seq):
+        """Block until every entry up to ``seq`` is on disk, flushing them if nobody else is."""
+        with self._flush_cond:
+            while self._flushing and self._flushed_seq < seq:
+                self._flush_cond.wait()
+            if self._flushed_seq >= seq:
+                return  # Another writer's flush already covered these entries
+            self._flushing = True
+            lines, self._queue = self._queue, []
+            flushed = self._queued_seq
+
+        try:
+            self._write_log(lines)
+        finally:
+            with self._flush_cond:
+                self._flushing = False
+                self._flushed_seq = max(self._flushed_seq, flushed)
+                self._flush_cond.notify_all()
+
+        if self._log_bytes > max(self.compact_ratio * self._snapshot_bytes, self.compact_min_bytes):
+            self._start_compaction()
+
+    def _write_log(self, lines):
+        if self._log_file is None:
+            self._log_file = open(self.log_path, "a")
+        data = "".join(lines)
+        self._log_file.write(data)
+        self._log_file.flush()
+        os.fsync(self._log_file.fileno())
+        self._log_bytes += len(data)
+        metrics.inc("bytes_written_total", len(data.encode("utf-8")), target="graph_log")
+
+    def _apply(self, entry):
+        # Entries the snapshot already has are skipped, e.g. after a crash between writing
+        # the snapshot and removing the log. Updates are idempotent anyway.
+        op = entry["op"]
+        if op == "add_node":
+            if not self._graph.has_node(entry["node"]["id"]):
+                self._index_node(entry["node"])
+        elif op == "update_node":
+            self._graph.update_node(entry["id"], entry["fields"])
+        elif op == "add_link":
+            link = entry["link"]
+            if not self._graph.has_link(link["source"], link["target"]):
+                self._index_link(link)
+        else:
+            raise KeyError(f"unknown op {op!r}")
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def _index_node(self, node):
+        node["id"] = _coerce_id(node["id"])
+        self._graph.add_node(node)
+        if node["id"] >= self._next_id:
+            self._next_id = node["id"] + 1
+
+    def _index_link(self, link):
+        link["source"] = _coerce_id(link["source"])
+        link["target"] = _coerce_id(link["target"])
+        self._graph.add_link(link)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self._graph.node_count()
+
+    def link_count(self):
+        return self._graph.link_count()
+
+    def get_node(self, node_id):
+        """Return a copy of the node with ``node_id``, or None."""
+        return self._graph.node(_coerce_id(node_id))
+
+    def has_node(self, node_id):
+        return self._graph.has_node(_coerce_id(node_id))
+
+    def find_node(self, name, lang=DEFAULT_LANG):
+        """Look up a node by name in ``lang``, ignoring case and following known redirects."""
+        if self.titles is not None:
+            for variant in self.titles.variants(name, lang):
+                node = self._graph.find(variant, lang)
+                if node is not None:
+                    return node
+        return self._graph.find(name, lang)
+
+    def has_link(self, source, target):
+        return self._graph.has_link(source, target)
+
+    def neighbors(self, node_id):
+        """Return the ids of all nodes linked to or from ``node_id``."""
+        node_id = _coerce_id(node_id)
+        return set(self._graph.targets(node_id)).union(self._graph.sources(node_id))
+
+    def degree(self, node_id):
+        return self._graph.degree(_coerce_id(node_id))
+
+    def neighborhood(self, node_id, hops=1, limit=500):
+        """Return the subgraph within ``hops`` links of a node, capped at ``limit`` nodes.
+
+        Nodes are collected breadth-first, so the closest ones are kept when the cap is hit.
+        """
+        with self._lock:
+            start = _coerce_id(node_id)
+            if not self._graph.has_node(start):
+                return None
+            distances = {start: 0}
+            queue = deque([start])
+            while queue and len(distances) < limit:
+                current = queue.popleft()
+                if distances[current] >= hops:
+                    continue
+                for neighbor in self.neighbors(current):
+                    if neighbor not in distances and self._graph.has_node(neighbor):
+                        distances[neighbor] = distances[current] + 1
+                        queue.append(neighbor)
+                        if len(distances) >= limit:
+                            break
+            return self._subgraph(distances)
+
+    def top_by_degree(self, n=50):
+        """Return the subgraph induced by the ``n`` best connected nodes."""
+        with self._lock:
+            ids = heapq.nlargest(n, self._graph.node_ids(), key=self._graph.degree)
+            return self._subgraph(ids)
+
+    def page_nodes(self, cursor=0, limit=1000):
+        """Return up to ``limit`` nodes starting at ``cursor`` and the cursor of the next page.
+
+        Nodes and links are only ever appended and snapshots keep their order,
+        so positions make stable cursors, across restarts too.
+        The next cursor is None on the last page.
+        """
+        with self._lock:
+            items = list(self._graph.iter_nodes(cursor, cursor + limit))
+            return items, self._next_cursor(cursor, limit, self._graph.node_count())
+
+    def page_links(self, cursor=0, limit=1000):
+        """Like ``page_nodes`` but over links."""
+        with self._lock:
+            items = list(self._graph.iter_links(cursor, cursor + limit))
+            return items, self._next_cursor(cursor, limit, self._graph.link_count())
+
+    def changes_since(self, version, full=True):
+        """Return the nodes and links added or changed after ``version``.
+
+        Falls back to the whole graph (with ``full`` set) when the change log no
+        longer reaches back to ``version``, e.g. after a restart, or returns
+        None then if ``full`` is false.
+        """
+        with self._lock:
+            oldest = self._changes[0][0] if self._changes else self.version + 1
+            if version < self._base_version or version > self.version or version < oldest - 1:
+                return {"version": self.version, "full": True, **self._snapshot()} if full else None
+
+            nodes = {}
+            links = []
+            for change_version, entry in reversed(self._changes):
+                if change_version <= version:
+                    break
+                if entry["op"] == "add_link":
+                    links.append(dict(entry["link"]))
+                else:
+                    node_id = entry["node"]["id"] if entry["op"] == "add_node" else entry["id"]
+                    if node_id not in nodes:
+                        nodes[node_id] = self._graph.node(node_id)
+            return {
+                "version": self.version,
+                "full": False,
+                "nodes": list(reversed(nodes.values())),
+                "links": links[::-1],
+            }
+
+    def edge_arrays(self):
+        """Return (version, node ids, link sources, link targets) as arrays copied under one lock."""
+        with self._lock:
+            return (self.version, *self._graph.arrays())
+
+    def subgraph(self, node_ids):
+        """Return the given nodes, in order, and the links between them."""
+        with self._lock:
+            return self._subgraph(node_id for node_id in node_ids if self._graph.has_node(node_id))
+
+    @staticmethod
+    def _next_cursor(cursor, limit, total):
+        return cursor + limit if cursor + limit < total else None
+
+    def _subgraph(self, ids):
+        ordered = list(ids)
+        nodes = [self._graph.node(node_id) for node_id in ordered]
+        return {"nodes": nodes, "links": list(self._graph.links_between(ordered))}
+
+    def snapshot(self):
+        """Return a copy of the whole graph in the graph.json schema."""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return self._graph.to_json()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add_node(self, name, **fields):
+        """Add a node named ``name`` and return it, or the existing node with that name.
+
+        A ``lang`` field puts the node in that language edition; English nodes
+        are stored without one.
+        """
+        with self.batch():
+            lang = fields.pop("lang", None) or DEFAULT_LANG
+            return self._add_node(name, lang, fields)
+
+    def _add_node(self, name, lang, fields):
+        existing = self.find_node(name, lang)
+        if existing is not None:
+            return existing
+        if self.titles is not None:
+            name = self.titles.canonical(name, lang) or name
+        node = {"id": self._next_id, "name": name, **fields}
+        if lang != DEFAULT_LANG:
+            node["lang"] = lang
+        self._index_node(node)
+        self._append({"op": "add_node", "node": node})
+        return dict(node)
+
+    def update_node(self, node_id, **fields):
+        with self.batch():
+            node_id = _coerce_id(node_id)
+            if not self._graph.has_node(node_id):
+                raise KeyError(f"No node with id {node_id}")
+            self._graph.update_node(node_id, fields)
+            self._append({"op": "update_node", "id": node_id, "fields": fields})
+            return self._graph.node(node_id)
+
+    def add_link(self, source, target, label=""):
+        """Add a link unless the same source -> target link already exists."""
+        with self.batch():
+            source, target = _coerce_id(source), _coerce_id(target)
+            if self.has_link(source, target):
+                return False
+            self._add_link(source, target, label)
+            return True
+
+    def _add_link(self, source, target, label=""):
+        link = {"source": source, "target": target, "label": label}
+        self._graph.add_link(link)
+        self._append({"op": "add_link", "link": link})
+
+    def merge_article_links(self, article_title, articles, **fields):
+        """Add ``article_title`` and a link from it to each of ``articles``.
+
+        The TextToJsonTool's merge into graph.json runs through this too, on an
+        in-memory store.
+        """
+        return self.merge_many_article_links([(article_title, articles)], **fields)[0]
+
+    @metrics.timed("graph_merge")
+    def merge_many_article_links(self, pairs, lang=DEFAULT_LANG, **fields):
+        """Merge many (article_title, articles) pairs of the ``lang`` Wikipedia with a single log flush.
+
+        ``fields`` are applied to newly created main article nodes. Returns the
+        main node of each pair.
+        """
+        lang = lang or DEFAULT_LANG
+        main_nodes = []
+        # Names seen in this merge, so repeated names skip the lookup
+        ids_by_name = {}
+        with self.batch():
+            for article_title, articles in pairs:
+                main_node = self._add_node(article_title, lang, fields)
+                ids_by_name[article_title] = main_node["id"]
+                # One set per article instead of scanning its adjacency for every link
+                linked = set(self._graph.targets(main_node["id"]))
+                for article in articles:
+                    node_id = ids_by_name.get(article)
+                    if node_id is None:
+                        node_id = ids_by_name[article] = self._add_node(article, lang, {})["id"]
+                    if node_id not in linked:
+                        linked.add(node_id)
+                        self._add_link(main_node["id"], node_id)
+                main_nodes.append(main_node)
+        return main_nodes
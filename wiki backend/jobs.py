@@ -0,0 +1,129 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from my_custom_tools import metrics
+
+
+class JobManager:
+    """Runs long expansions on a bounded worker pool and tracks their progress.
+
+    Jobs are identified by a generated id. Submitting a job whose ``key``
+    matches one that is still queued or running returns the existing job
+    instead of starting another, so identical requests are coalesced.
+    """
+
+    def __init__(self, max_workers=4, max_finished=1000):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._cond = threading.Condition()
+
+    def submit(self, kind, key, fn, *args, **kwargs):
+        """Queue ``fn(report, *args, **kwargs)`` and return the job's public state.
+
+        ``report`` is a callable the job can use to publish progress events.
+        """
+        with self._cond:
+            job_id = self._in_flight.get((kind, key))
+            if job_id is not None:
+                job = self._jobs[job_id]
+                job["coalesced"] += 1
+                return self._public(job)
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "status": "queued",
+                "events": [],
+                "result": None,
+                "error": None,
+                "errorType": None,
+                "coalesced": 0,
+                "createdAt": time.time(),
+                "finishedAt": None,
+            }
+            self._jobs[job["id"]] = job
+            self._in_flight[(kind, key)] = job["id"]
+            self._prune()
+
+        self._pool.submit(self._run, job, (kind, key), fn, args, kwargs)
+        return self._public(job)
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job is not None else None
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job has finished (or ``timeout`` passes) and return its state."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._cond.wait_for(lambda: job["finishedAt"] is not None, timeout)
+            return self._public(job)
+
+    def events(self, job_id, timeout=15):
+        """Yield the job's progress events as they happen, ending once it has finished.
+
+        Yields None if nothing happened for ``timeout`` seconds, so callers can
+        send keep-alives.
+        """
+        seen = 0
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if seen == len(job["events"]) and job["finishedAt"] is None:
+                    self._cond.wait(timeout)
+                new_events = job["events"][seen:]
+                seen += len(new_events)
+                finished = job["finishedAt"] is not None and seen == len(job["events"])
+            if not new_events and not finished:
+                yield None
+            for event in new_events:
+                yield event
+            if finished:
+                return
+
+    def _run(self, job, key, fn, args, kwargs):
+        self._update(job, status="running")
+        try:
+            with metrics.span("job", kind=job["kind"]):
+                result = fn(lambda event: self._update(job, event=event), *args, **kwargs)
+        except Exception as e:
+            print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            job["errorType"] = type(e).__name__
+            self._update(job, status="failed", error=str(e), key=key)
+        else:
+            self._update(job, status="done", result=result, key=key)
+        metrics.inc("jobs_total", kind=job["kind"], status=job["status"])
+
+    def _update(self, job, status=None, event=None, result=None, error=None, key=None):
+        with self._cond:
+            if status is not None:
+                job["status"] = status
+                job["result"] = result
+                job["error"] = error
+                event = {"status": status}
+                if status in ("done", "failed"):
+                    job["finishedAt"] = time.time()
+                    self._in_flight.pop(key, None)
+                    if error is not None:
+                        event["error"] = error
+            job["events"].append(event)
+            self._cond.notify_all()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["finishedAt"] is not None]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _public(job):
+        return {key: value for key, value in job.items() if key != "events"}
@@ -0,0 +1,102 @@
+# my_custom_tools/atomic_io.py
+
+import json
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+# The process umask, read once at import: os.umask can only be read by setting it
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _path_locks_lock:
+        return _path_locks.setdefault(str(path.resolve()), threading.Lock())
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive lock on ``path`` for a read-modify-write cycle.
+
+    Threads in this process are serialized with a per-path lock, and other
+    processes with an flock on a ``.lock`` file next to it where available.
+    The lock file is removed again on release.
+    """
+    path = Path(path)
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+        lock_path = str(path) + ".lock"
+        while True:
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # The holder before us may have removed the file we opened; lock the current one then
+            try:
+                if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path)):
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        try:
+            yield
+        finally:
+            os.remove(lock_path)
+            lock_file.close()
+
+
+@contextmanager
+def atomic_writer(path):
+    """Yield a binary file that replaces ``path`` only once the block completes.
+
+    The data goes to a temporary file next to ``path`` which is fsynced and
+    renamed into place, so readers see either the old file or the new one,
+    never a truncated one. If the block raises, ``path`` is left untouched.
+    The new file keeps the permissions of the one it replaces, or gets the
+    usual ones for a new file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_umask
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_name, mode)
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def atomic_write_bytes(path, data: bytes):
+    """Write ``data`` to ``path`` atomically (see ``atomic_writer``)."""
+    with atomic_writer(path) as f:
+        f.write(data)
+
+
+def atomic_write_text(path, text: str, encoding: str = "utf-8"):
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def atomic_write_json(path, data, indent=2):
+    atomic_write_text(path, json.dumps(data, indent=indent))
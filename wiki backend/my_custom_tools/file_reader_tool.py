@@ -1,16 +1,38 @@
 from pathlib import Path
-import pandas as pd
+from typing import Optional
 import json
+import mmap
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+
+# Upper bound on what a single call returns, so big files don't flood the LLM context
+DEFAULT_MAX_BYTES = 100_000
+CSV_CHUNK_ROWS = 10_000
 
 
 class FileReaderToolSchema(BaseModel):
     """Schema defining the inputs for the FileReaderTool."""
 
-    filename: str = Field(..., 
+    filename: str = Field(...,
         description="The location where the file should be read from",
     )
+    offset: int = Field(0,
+        description="Where to start reading: a byte offset for text files, a row for CSV/Excel files "
+                    "and an item index into each list for large JSON files",
+    )
+    limit: Optional[int] = Field(None,
+        description="Maximum number of rows (CSV/Excel) or list items (large JSON files) to return",
+    )
+    start_line: Optional[int] = Field(None,
+        description="First line to return from a text file (1-based). Overrides offset",
+    )
+    end_line: Optional[int] = Field(None,
+        description="Last line to return from a text file (1-based, inclusive)",
+    )
+    max_bytes: int = Field(DEFAULT_MAX_BYTES,
+        description="Maximum amount of content to return; longer content is cut off with a note on how to continue",
+    )
 
 
 class FileReaderTool(Tool[str]):
@@ -18,24 +40,203 @@ class FileReaderTool(Tool[str]):
 
     id: str = "file_reader_tool"
     name: str = "File reader tool"
-    description: str = "Finds and reads content from a local file on Disk"
+    description: str = (
+        "Finds and reads content from a local file on Disk. Large files are returned a page at a time; "
+        "use offset, limit or start_line/end_line to read further"
+    )
     args_schema: type[BaseModel] = FileReaderToolSchema
     output_schema: tuple[str, str] = ("str", "A string dump or JSON of the file content")
 
-    def run(self, _: ToolRunContext, filename: str) -> str | dict[str,any]:       
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, filename: str, offset: int = 0, limit: Optional[int] = None,
+            start_line: Optional[int] = None, end_line: Optional[int] = None,
+            max_bytes: int = DEFAULT_MAX_BYTES) -> str | dict[str,any]:
         """Run the FileReaderTool."""
-        
+
         file_path = Path(filename)
         suffix = file_path.suffix.lower()
 
         if file_path.is_file():
             if suffix == '.csv':
-                return pd.read_csv(file_path).to_string()
+                return _read_csv(file_path, offset, limit, max_bytes)
             elif suffix == '.json':
-                with file_path.open('r', encoding='utf-8') as json_file:
-                    data = json.load(json_file)
-                    return data
+                # Files that fit in the budget are returned whole; others a page at a time
+                if file_path.stat().st_size <= max_bytes and offset == 0 and limit is None:
+                    with file_path.open('r', encoding='utf-8') as json_file:
+                        data = json.load(json_file)
+                        return data
+                return _stream_json(file_path, offset, limit, max_bytes)
             elif suffix in ['.xls', '.xlsx']:
-                return pd.read_excel(file_path).to_string()
+                import pandas as pd  # Imported on use: pandas takes longer to import than everything else here
+                rows = pd.read_excel(file_path, skiprows=range(1, offset + 1), nrows=limit)
+                return _truncate(rows.to_string(), max_bytes, f"use offset={offset} with a smaller limit")
             elif suffix in ['.txt', '.log']:
-                return file_path.read_text(encoding="utf-8")
\ No newline at end of file
+                return _read_text(file_path, offset, start_line, end_line, max_bytes)
+
+
+def _truncate(text: str, max_bytes: int, hint: str) -> str:
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    kept = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    return f"{kept}\n[... truncated {len(encoded) - max_bytes} bytes; {hint}]"
+
+
+def _read_text(file_path: Path, offset: int, start_line: Optional[int], end_line: Optional[int],
+               max_bytes: int) -> str:
+    """Read a byte or line range through mmap, so only the requested part is paged in."""
+    size = file_path.stat().st_size
+    if size == 0:
+        return ""
+    with file_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if start_line is not None or end_line is not None:
+            start = _line_start(data, (start_line or 1) - 1)
+            end = _line_start(data, end_line) if end_line is not None else size
+        else:
+            start, end = min(offset, size), size
+        stop = min(end, start + max_bytes)
+        if stop < end:
+            # Cut before a character that doesn't fit entirely, so continuing from stop loses nothing
+            boundary = stop
+            while boundary > start and data[boundary] & 0xC0 == 0x80:
+                boundary -= 1
+            if boundary > start:
+                stop = boundary
+        text = data[start:stop].decode("utf-8", errors="ignore")
+    if stop < end:
+        text += f"\n[... truncated; continue with offset={stop}]"
+    return text
+
+
+def _line_start(data: mmap.mmap, line_index: int) -> int:
+    """Byte offset at which the 0-based line ``line_index`` starts (end of file if past it)."""
+    position = 0
+    for _ in range(line_index):
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return len(data)
+        position = newline + 1
+    return position
+
+
+def _read_csv(file_path: Path, offset: int, limit: Optional[int], max_bytes: int) -> str:
+    """Read rows offset..offset+limit in chunks, stopping once enough rows or bytes are collected."""
+    import pandas as pd
+    parts = []
+    size = 0
+    rows_read = 0
+    reader = pd.read_csv(file_path, skiprows=range(1, offset + 1), nrows=limit, chunksize=CSV_CHUNK_ROWS)
+    for chunk in reader:
+        text = chunk.to_string(header=not parts)
+        parts.append(text)
+        size += len(text)
+        rows_read += len(chunk)
+        if size > max_bytes:
+            break
+    return _truncate("\n".join(parts), max_bytes,
+                     f"continue with offset={offset + rows_read} or request fewer rows")
+
+
+class _JsonStream:
+    """Incremental reader for the top level of a JSON document, holding one value at a time."""
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self):
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+
+    def peek(self) -> str:
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position].isspace():
+                self._position += 1
+            if self._position < len(self._buffer) or self._eof:
+                return self._buffer[self._position:self._position + 1]
+            self._fill()
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream")
+        self._position += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # A number running to the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+def _stream_json(file_path: Path, offset: int, limit: Optional[int], max_bytes: int):
+    """Page through a large JSON object whose values are lists, such as graph.json.
+
+    Returns items offset..offset+limit of each list and keeps other values as
+    they are. The lists share ``max_bytes``: once it is used up they are cut
+    short, but the first list always returns at least one item. ``next_offset``
+    is the first index not returned from some list, or None when everything
+    was returned. A top-level list is paged the same way and returned under
+    "items"; any other document is returned as truncated JSON text.
+    """
+    result = {}
+    next_offset = None
+    budget = max_bytes
+    returned = 0
+
+    def read_list(items):
+        nonlocal next_offset, budget, returned
+        stream.expect("[")
+        index = 0
+        while stream.peek() != "]":
+            item = stream.value()
+            in_page = index >= offset and (limit is None or index < offset + limit)
+            if in_page and (budget > 0 or not returned):
+                items.append(item)
+                budget -= len(json.dumps(item))
+                returned += 1
+            elif index >= offset and (next_offset is None or index < next_offset):
+                next_offset = index
+            index += 1
+            if stream.peek() == ",":
+                stream.expect(",")
+        stream.expect("]")
+
+    with file_path.open("r", encoding="utf-8") as f:
+        stream = _JsonStream(f)
+        if stream.peek() == "[":
+            items = []
+            read_list(items)
+            return {"items": items, "next_offset": next_offset}
+        if stream.peek() != "{":
+            return _truncate(json.dumps(stream.value()), max_bytes, "the document is a single value")
+
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
+            if stream.peek() != "[":
+                result[key] = stream.value()
+            else:
+                items = []
+                read_list(items)
+                result[key] = items
+            if stream.peek() == ",":
+                stream.expect(",")
+    result["next_offset"] = next_offset
+    return result
@@ -1,6 +1,20 @@
+import gzip
+import io
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterable, Literal, Optional
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.atomic_io import atomic_writer, locked
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
 
 class FileWriterToolSchema(BaseModel):
     """Schema defining the inputs for the FileWriterTool."""
@@ -11,6 +25,13 @@ class FileWriterToolSchema(BaseModel):
     content: str = Field(..., 
         description="The content to write to the file",
     )
+    mode: Literal["overwrite", "append", "create"] = Field("overwrite",
+        description="'overwrite' replaces the file, 'append' adds to the end of it and "
+                    "'create' only writes if the file doesn't exist yet",
+    )
+    compression: Optional[Literal["gzip", "zstd"]] = Field(None,
+        description="Compress the output. Defaults to the filename's suffix (.gz or .zst)",
+    )
 
 
 class FileWriterTool(Tool):
@@ -18,18 +39,75 @@ class FileWriterTool(Tool):
 
     id: str = "file_writer_tool"
     name: str = "File writer tool"
-    description: str = "Writes content to a file locally"
+    description: str = "Writes content to a file locally, replacing it, appending to it or only creating it"
     args_schema: type[BaseModel] = FileWriterToolSchema
     output_schema: tuple[str, str] = ("str", "A string indicating where the content was written to")
 
-    def run(self, _: ToolRunContext, filename: str, content: str) -> str:
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, filename: str, content: str, mode: str = "overwrite",
+            compression: Optional[str] = None) -> str:
         """Run the FileWriterTool."""
-        
-        filepath = Path(filename)
-        if filepath.is_file():
-            with open(filepath, "w") as file:
-                file.write(content)
+
+        if not write_file(filename, content, mode, compression):
+            return f"{filename} already exists, nothing was written"
+        if mode == "append":
+            return f"Content appended to {filename}"
+        return f"Content written to {filename}"
+
+
+def write_file(filename, content: str | Iterable[str], mode: str = "overwrite",
+               compression: Optional[str] = None) -> bool:
+    """Write ``content`` (a string, or an iterable of strings written in order) to ``filename``.
+
+    ``overwrite`` goes through a temporary file and a rename, so readers never
+    see a half-written file. ``append`` only writes the new data, which keeps
+    incremental dumps cheap; compressed files get a new gzip member or zstd
+    frame per append, which the usual readers handle. ``create`` uses an
+    exclusive open and returns False if the file already exists.
+    """
+    path = Path(filename)
+    if compression is None:
+        compression = COMPRESSION_SUFFIXES.get(path.suffix.lower())
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package")
+    if isinstance(content, str):
+        content = (content,)
+
+    with locked(path):
+        if mode == "overwrite":
+            with atomic_writer(path) as raw, _text_stream(raw, compression) as f:
+                f.writelines(content)
+            return True
+        if mode not in ("append", "create"):
+            raise ValueError(f"Unknown write mode: {mode}")
+        try:
+            raw = open(path, "ab" if mode == "append" else "xb")
+        except FileExistsError:
+            return False
+        with raw, _text_stream(raw, compression) as f:
+            f.writelines(content)
+        return True
+
+
+@contextmanager
+def _text_stream(raw, compression):
+    """Buffered UTF-8 text stream over ``raw``, compressing if asked. Leaves ``raw`` open."""
+    start = raw.tell()
+    if compression == "gzip":
+        stream = gzip.GzipFile(fileobj=raw, mode="wb")
+    elif compression == "zstd":
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    elif compression is None:
+        stream = raw
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    text = io.TextIOWrapper(stream, encoding="utf-8")
+    try:
+        yield text
+    finally:
+        text.flush()
+        if stream is raw:
+            text.detach()
         else:
-            with open(filepath, "x") as file:
-                file.write(content)
-        return f"Content written to {filename}"
\ No newline at end of file
+            text.close()  # Writes the gzip trailer / ends the zstd frame
+        metrics.inc("bytes_written_total", raw.tell() - start, target="file_writer")
@@ -0,0 +1,98 @@
+# my_custom_tools/http_client.py
+
+import os
+import re
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from my_custom_tools import metrics
+from my_custom_tools.rate_limiter import get_rate_limiter
+
+USER_AGENT = "izaakbot"
+# Throttling and transient server errors are retried with exponential backoff
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Wikipedia language edition codes such as "en", "de", "zh-yue" or "simple"
+LANGUAGE_CODE = re.compile(r"[a-z][a-z0-9]*(-[a-z0-9]+)*")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def api_url(lang: str = "en") -> str:
+    """MediaWiki API endpoint of a language edition.
+
+    WIKIPEDIA_API_URL overrides it, e.g. to point at a local stub server; a
+    ``{lang}`` in it is replaced by the language code. Raises ValueError for
+    anything that isn't a language code, since it becomes part of the host name.
+    """
+    if not LANGUAGE_CODE.fullmatch(lang):
+        raise ValueError(f"Invalid Wikipedia language code: {lang!r}")
+    override = os.environ.get("WIKIPEDIA_API_URL")
+    if override:
+        return override.replace("{lang}", lang)
+    return f"https://{lang}.wikipedia.org/w/api.php"
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session used for every Wikipedia request.
+
+    Connections are pooled per host, so repeat calls reuse an open socket
+    instead of doing a new TCP/TLS handshake, and each language edition (a
+    host of its own) gets a separate pool. Settings come from:
+
+        WIKI_HTTP_POOL_SIZE        connections kept open per host (default 16)
+        WIKI_HTTP_MAX_HOSTS        hosts whose pools are kept at once (default 32)
+        WIKI_HTTP_RETRIES          retries on 429/5xx and connection errors (default 3)
+        WIKI_HTTP_BACKOFF          backoff factor in seconds between retries (default 0.5)
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def _build_session() -> requests.Session:
+    pool_size = int(os.environ.get("WIKI_HTTP_POOL_SIZE", "16"))
+    retry = Retry(
+        total=int(os.environ.get("WIKI_HTTP_RETRIES", "3")),
+        backoff_factor=float(os.environ.get("WIKI_HTTP_BACKOFF", "0.5")),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # pool_connections is the number of per-host pools kept, pool_maxsize the connections in each
+    adapter = HTTPAdapter(pool_connections=int(os.environ.get("WIKI_HTTP_MAX_HOSTS", "32")),
+                          pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"})
+    return session
+
+
+def get_json(url: str, params: dict) -> dict:
+    """GET a MediaWiki API URL through the shared session and rate limiter and return the decoded JSON.
+
+    Timeouts are WIKI_HTTP_CONNECT_TIMEOUT (default 5s) and WIKI_HTTP_TIMEOUT
+    for reading the response (default 30s).
+    """
+    with metrics.span("wikipedia_rate_limit_wait"):
+        get_rate_limiter(urlparse(url).netloc).acquire()
+    timeout = (float(os.environ.get("WIKI_HTTP_CONNECT_TIMEOUT", "5")),
+               float(os.environ.get("WIKI_HTTP_TIMEOUT", "30")))
+    with metrics.span("wikipedia_http"):
+        response = get_session().get(url, params=params, timeout=timeout)
+        content = response.content
+    metrics.inc("wikipedia_http_requests_total", status=response.status_code)
+    metrics.inc("wikipedia_http_bytes_total", len(content))
+    # urllib3 records the retries it made for this response
+    retries = getattr(response.raw, "retries", None)
+    if retries is not None and retries.history:
+        metrics.inc("wikipedia_http_retries_total", len(retries.history))
+    response.raise_for_status()
+    return response.json()
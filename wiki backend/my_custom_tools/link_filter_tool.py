@@ -1,19 +1,36 @@
+from functools import lru_cache
 from pathlib import Path
-from typing import List
-import re
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.link_filter import LinkFilter
+from my_custom_tools.result_store import link_results
+
+
+@lru_cache(maxsize=256)
+def get_link_filter(article_title: str, **rules) -> LinkFilter:
+    """Compiled filter for an article and rule set, reused across calls."""
+    return LinkFilter(article_title, **rules)
+
+
+def filter_links(article_title: str, links: List[str], **rules) -> List[str]:
+    """Drop links that contain the article title, numbers, or colons, plus any extra ``rules``."""
+    return get_link_filter(article_title, **rules).filter(links)
 
 
 class LinkFilterToolSchema(BaseModel):
     """Schema for LinkFilterTool."""
     
     article_title: str = Field(..., description="The name of the main article to avoid linking to itself.")
-    input_file: str = Field(..., description="The path to the .txt file containing the links to filter.")
+    links: Optional[List[str]] = Field(None, description="The links to filter. Leave empty to use the links last fetched for the article.")
+    input_file: Optional[str] = Field(None, description="The path to a .txt file containing the links to filter, one per line.")
+    exclude_disambiguation: bool = Field(False, description="Also drop disambiguation pages.")
+    exclude_lists: bool = Field(False, description="Also drop 'List of ...', 'Index of ...' and similar pages.")
 
 
 class LinkFilterTool(Tool[List[str]]):
-    """Filters out irrelevant or self-referencing links from a .txt file."""
+    """Filters out irrelevant or self-referencing links from a list or a .txt file."""
 
     id: str = "link_filter_tool"
     name: str = "Link Filter Tool"
@@ -21,27 +38,25 @@ class LinkFilterTool(Tool[List[str]]):
     args_schema: type[BaseModel] = LinkFilterToolSchema
     output_schema: tuple[str, str] = ("list[str]", "List of cleaned, filtered links.")
 
-    def run(self, _: ToolRunContext, article_title: str, input_file: str) -> List[str]:
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, article_title: str, links: Optional[List[str]] = None,
+            input_file: Optional[str] = None, exclude_disambiguation: bool = False,
+            exclude_lists: bool = False) -> List[str]:
         """Run the LinkFilterTool."""
-        file_path = Path(input_file)
-
-        if not file_path.exists():
-            raise FileNotFoundError(f"{file_path} not found.")
-
-        article_title_lower = article_title.lower()
-
-        with file_path.open("r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f if line.strip()]
-
-        # Define filters
-        def is_valid(link: str) -> bool:
-            link_lower = link.lower()
-            return (
-                article_title_lower not in link_lower and
-                not re.search(r"\d", link) and
-                ":" not in link
-            )
-
-        filtered_links = [link for link in lines if is_valid(link)]
-
-        return filtered_links
+        link_filter = get_link_filter(article_title, exclude_disambiguation=exclude_disambiguation,
+                                      exclude_lists=exclude_lists)
+        if links is not None:
+            filtered = link_filter.filter([link.strip() for link in links if link.strip()])
+        elif input_file is None:
+            links = link_results.latest(article_title)
+            if links is None:
+                raise ValueError(f"No links have been fetched for '{article_title}'; pass links or input_file.")
+            filtered = link_filter.filter(links)
+        elif not Path(input_file).exists():
+            raise FileNotFoundError(f"{input_file} not found.")
+        else:
+            filtered = link_filter.filter_file(input_file)
+
+        # The text to json tool picks up the article's latest links, which should be the filtered ones
+        link_results.put(article_title, filtered)
+        return filtered
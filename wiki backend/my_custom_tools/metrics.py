@@ -0,0 +1,271 @@
+# my_custom_tools/metrics.py
+
+import cProfile
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Every metric is exported with this prefix
+PREFIX = "wiki_"
+# Upper bounds (seconds) of the duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "span_seconds": "Time spent in instrumented code paths, by span",
+    "cache_hits_total": "Cache lookups answered from the cache, by cache",
+    "cache_misses_total": "Cache lookups that had to compute or fetch, by cache",
+    "portia_plan_retries_total": "Retries of run_portia_plan after a failed attempt",
+    "bytes_written_total": "Bytes written to disk, by target",
+    "wikipedia_http_requests_total": "Wikipedia API responses, by status code",
+    "wikipedia_http_retries_total": "Wikipedia API requests retried by the HTTP adapter",
+    "wikipedia_http_bytes_total": "Bytes received from the Wikipedia API (decoded)",
+    "http_requests_total": "Requests served, by endpoint and status",
+    "jobs_total": "Finished background jobs, by kind and status",
+    "errors_total": "Errors that were logged and handled, by source",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _sanitize(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class Metrics:
+    """Thread-safe counters, duration histograms and gauges, rendered in the Prometheus text format.
+
+    Counters and histograms are created on first use; a series is a metric
+    name plus its labels. Gauges are callables read at render time, e.g. the
+    number of nodes in the graph.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}  # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: [bucket counts..., sum, count]}
+        self._gauges = {}  # name -> (help, fn)
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def register_gauge(self, name, fn, help=""):
+        """Export ``fn()`` as gauge ``name`` on every render. Errors skip the gauge."""
+        with self._lock:
+            self._gauges[name] = (help, fn)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def render(self):
+        """The current values in the Prometheus text exposition format."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: list(values) for key, values in series.items()}
+                          for name, series in self._histograms.items()}
+            gauges = dict(self._gauges)
+
+        lines = []
+        for name in sorted(counters):
+            full = PREFIX + _sanitize(name)
+            self._header(lines, full, HELP.get(name), "counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{full}{_format_labels(key)} {value}")
+
+        for name in sorted(histograms):
+            full = PREFIX + _sanitize(name)
+            self._header(lines, full, HELP.get(name), "histogram")
+            for key, values in sorted(histograms[name].items()):
+                for bound, count in zip(self.buckets, values):
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', str(bound))])} {count}")
+                lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} {values[-1]}")
+                lines.append(f"{full}_sum{_format_labels(key)} {values[-2]}")
+                lines.append(f"{full}_count{_format_labels(key)} {values[-1]}")
+
+        for name in sorted(gauges):
+            help, fn = gauges[name]
+            try:
+                value = fn()
+            except Exception:
+                continue
+            full = PREFIX + _sanitize(name)
+            self._header(lines, full, help, "gauge")
+            lines.append(f"{full} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines, full_name, help, kind):
+        if help:
+            lines.append(f"# HELP {full_name} {help}")
+        lines.append(f"# TYPE {full_name} {kind}")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def inc(name, value=1, **labels):
+    """Add ``value`` to counter ``name``."""
+    _metrics.inc(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    """Record a duration in histogram ``name``."""
+    _metrics.observe(name, seconds, **labels)
+
+
+def register_gauge(name, fn, help=""):
+    _metrics.register_gauge(name, fn, help)
+
+
+def render_prometheus() -> str:
+    return _metrics.render()
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the block into the ``span_seconds`` histogram under ``span=name``.
+
+    The duration is recorded whether the block returns or raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.observe("span_seconds", time.perf_counter() - start, span=name, **labels)
+
+
+def timed(name, **labels):
+    """Decorator form of ``span``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_tool_run(run):
+    """Decorator for a Portia tool's ``run``: a ``tool_run`` span labelled with the tool id."""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        with span("tool_run", tool=self.id):
+            return run(self, *args, **kwargs)
+    return wrapper
+
+
+# ----------------------------------------------------------------------
+# Profiling
+# ----------------------------------------------------------------------
+
+# WIKI_PROFILE=1 profiles every request from the start; set_profiling toggles it at runtime
+_profiling = os.environ.get("WIKI_PROFILE", "") not in ("", "0")
+# Only one cProfile profiler can be active at a time
+_profile_lock = threading.Lock()
+# Profiles kept on disk; older ones are deleted as new ones are written
+PROFILE_KEEP = int(os.environ.get("WIKI_PROFILE_KEEP", "200"))
+
+
+def profile_dir() -> str:
+    """Where profiles are written: WIKI_PROFILE_DIR, or "profiles" in the working directory."""
+    return os.environ.get("WIKI_PROFILE_DIR") or os.path.abspath("profiles")
+
+
+def profiling_enabled() -> bool:
+    return _profiling
+
+
+def set_profiling(enabled: bool):
+    global _profiling
+    _profiling = bool(enabled)
+
+
+def start_profile():
+    """Start a cProfile profiler, or return None if another profile is already running."""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except Exception:
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def stop_profile(profiler, name=None):
+    """Stop ``profiler`` and dump its stats to ``<profile_dir>/<name>-<timestamp>.prof``. Returns the path.
+
+    Without a ``name`` the profile is discarded and None is returned.
+    """
+    try:
+        profiler.disable()
+    finally:
+        _profile_lock.release()
+    if name is None:
+        return None
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{_sanitize(name)}-{time.time_ns()}.prof")
+    profiler.dump_stats(path)
+    _prune_profiles(directory)
+    return path
+
+
+def _prune_profiles(directory):
+    """Delete all but the newest PROFILE_KEEP profiles in ``directory``."""
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".prof"):
+            try:
+                profiles.append((entry.stat().st_mtime_ns, entry.path))
+            except OSError:
+                pass
+    profiles.sort()
+    for _, path in profiles[:max(0, len(profiles) - PROFILE_KEEP)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
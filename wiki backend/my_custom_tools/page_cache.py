@@ -0,0 +1,204 @@
+# my_custom_tools/page_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from my_custom_tools import metrics
+from my_custom_tools.titles import normalize_title
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "wiki_cache.sqlite3"
+
+
+def cache_key(title: str, lang: str = "en") -> tuple[str, str]:
+    """Normalize a title so that "philosophy", "Philosophy" and "Philosophy " share an entry."""
+    return lang, normalize_title(title)
+
+
+class PageCache:
+    """Two-tier cache of Wikipedia pages: a bounded in-memory LRU in front of SQLite.
+
+    Entries are keyed by normalized title and language and hold the page text,
+    its links, its interlanguage links ({language: title}) and revision id. Any
+    of those may be missing when only some of them have been fetched so far. Entries older than ``ttl`` seconds are
+    treated as misses, and the disk tier drops its least recently used rows once
+    it holds more than ``max_disk_entries``.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_entries=256, max_disk_entries=20000,
+                 ttl=7 * 24 * 3600):
+        self.path = str(path)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                lang TEXT NOT NULL,
+                title TEXT NOT NULL,
+                exists_ INTEGER NOT NULL,
+                text TEXT,
+                links TEXT,
+                revid INTEGER,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                langlinks TEXT,
+                PRIMARY KEY (lang, title)
+            )"""
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "langlinks" not in columns:  # Cache files from before interlanguage links were cached
+            self._db.execute("ALTER TABLE pages ADD COLUMN langlinks TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+        self._db.commit()
+
+    def get(self, title: str, lang: str = "en") -> dict | None:
+        """Return the cached entry for a page, or None if it is missing or expired."""
+        key = cache_key(title, lang)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry["fetched_at"] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                metrics.inc("cache_hits_total", cache="page_memory")
+                return entry
+
+            row = self._db.execute(
+                "SELECT exists_, text, links, revid, fetched_at, langlinks FROM pages WHERE lang = ? AND title = ?",
+                key,
+            ).fetchone()
+            if row is None or now - row[4] > self.ttl:
+                self._memory.pop(key, None)
+                self.misses += 1
+                metrics.inc("cache_misses_total", cache="page")
+                return None
+
+            self._db.execute(
+                "UPDATE pages SET accessed_at = ? WHERE lang = ? AND title = ?", (now, *key)
+            )
+            self._db.commit()
+            entry = {
+                "lang": key[0],
+                "title": key[1],
+                "exists": bool(row[0]),
+                "text": row[1],
+                "links": json.loads(row[2]) if row[2] is not None else None,
+                "langlinks": json.loads(row[5]) if row[5] is not None else None,
+                "revid": row[3],
+                "fetched_at": row[4],
+            }
+            self._remember(key, entry)
+            self.hits += 1
+            metrics.inc("cache_hits_total", cache="page_disk")
+            return entry
+
+    def put(self, title: str, lang: str = "en", exists: bool = True, text: str | None = None,
+            links: list[str] | None = None, revid: int | None = None,
+            langlinks: dict[str, str] | None = None) -> dict:
+        """Store page data, keeping any text or links already cached for the same revision."""
+        key = cache_key(title, lang)
+        now = time.time()
+        with self._lock:
+            previous = self._memory.get(key)
+            if previous is None:
+                row = self._db.execute(
+                    "SELECT text, links, revid, langlinks FROM pages WHERE lang = ? AND title = ?", key
+                ).fetchone()
+                if row is not None:
+                    previous = {"text": row[0], "links": json.loads(row[1]) if row[1] else None, "revid": row[2],
+                                "langlinks": json.loads(row[3]) if row[3] else None}
+            if exists and previous is not None and (revid is None or previous["revid"] in (None, revid)):
+                text = text if text is not None else previous["text"]
+                links = links if links is not None else previous["links"]
+                langlinks = langlinks if langlinks is not None else previous["langlinks"]
+                revid = revid if revid is not None else previous["revid"]
+
+            entry = {
+                "lang": key[0],
+                "title": key[1],
+                "exists": exists,
+                "text": text,
+                "links": links,
+                "langlinks": langlinks,
+                "revid": revid,
+                "fetched_at": now,
+            }
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (lang, title, exists_, text, links, revid, fetched_at, accessed_at, "
+                "langlinks) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, int(exists), text, json.dumps(links) if links is not None else None, revid, now, now,
+                 json.dumps(langlinks) if langlinks is not None else None),
+            )
+            self._evict_disk()
+            self._db.commit()
+            self._remember(key, entry)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM pages")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        count = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """Return the cache shared by the Wikipedia tools, creating it on first use.
+
+    The location can be moved with WIKI_CACHE_PATH, e.g. to point tests at a
+    pre-seeded cache file.
+    """
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(os.environ.get("WIKI_CACHE_PATH", DEFAULT_CACHE_PATH))
+        return _page_cache
+
+
+def is_offline() -> bool:
+    """WIKI_CACHE_OFFLINE=1 serves pages from the cache only and never calls Wikipedia."""
+    return os.environ.get("WIKI_CACHE_OFFLINE", "") not in ("", "0", "false")
@@ -0,0 +1,83 @@
+# my_custom_tools/page_query.py
+
+from my_custom_tools.http_client import api_url, get_json
+from my_custom_tools.page_cache import get_page_cache, is_offline
+from my_custom_tools.titles import MAX_TITLES_PER_QUERY, follow_redirects, get_title_index
+
+
+def query_prop(titles: list[str], lang: str, prop: str, **params) -> dict[str, list[dict] | None]:
+    """Fetch one ``prop`` (e.g. "links" or "langlinks") for a batch of titles, following continuation.
+
+    Returns each title's raw ``prop`` items, or None for a title with no such
+    page. Redirects are followed, so a redirect gets the items of its target,
+    and the redirects seen are recorded in the title index. ``params`` are
+    extra query parameters such as the prop's limit.
+    """
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": prop,
+        "redirects": "1",
+        "titles": "|".join(titles),
+        **params,
+    }
+    # Normalizations and redirects MediaWiki applied, to map its page titles back to the asked ones
+    renamed = {}
+    items = {}
+    missing = set()
+    url = api_url(lang)
+
+    continuation = {}
+    while True:
+        data = get_json(url, {**params, **continuation})
+        query = data.get("query", {})
+
+        renamed.update((item["from"], item["to"]) for item in query.get("normalized", []))
+        renamed.update((item["from"], item["to"]) for item in query.get("redirects", []))
+        for page in query.get("pages", []):
+            if page.get("missing") or page.get("invalid"):
+                missing.add(page["title"])
+                continue
+            items.setdefault(page["title"], []).extend(page.get(prop, []))
+
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+
+    # Several asked titles may redirect to the same page
+    canonical = {title: follow_redirects(title, renamed) for title in titles}
+    get_title_index().add(canonical, lang)
+    return {title: None if canonical[title] in missing else items.get(canonical[title], [])
+            for title in titles}
+
+
+def fetch_cached(titles: list[str], lang: str, field: str, query) -> dict:
+    """Return ``{title: value}`` of one page cache ``field``; None marks an article that does not exist.
+
+    Titles whose ``field`` is already cached are served from the page cache; the
+    rest are requested 50 at a time with ``query(batch, lang)`` and written back
+    under ``field``. Pages are cached under their canonical title, so a redirect
+    and its target share an entry.
+    """
+    cache = get_page_cache()
+    index = get_title_index()
+    result = {}
+    to_fetch = []
+    for title in dict.fromkeys(titles):
+        entry = cache.get(index.canonical(title, lang) or title, lang)
+        if entry is not None and (not entry["exists"] or entry[field] is not None):
+            result[title] = entry[field] if entry["exists"] else None
+        else:
+            to_fetch.append(title)
+
+    if to_fetch and is_offline():
+        raise LookupError(f"{len(to_fetch)} titles are not in the page cache and WIKI_CACHE_OFFLINE is set.")
+
+    for start in range(0, len(to_fetch), MAX_TITLES_PER_QUERY):
+        batch = to_fetch[start:start + MAX_TITLES_PER_QUERY]
+        for title, value in query(batch, lang).items():
+            cache.put(index.canonical(title, lang) or title, lang, exists=value is not None, **{field: value})
+            result[title] = value
+
+    return result
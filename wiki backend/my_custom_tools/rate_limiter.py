@@ -0,0 +1,47 @@
+# my_custom_tools/rate_limiter.py
+
+import os
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket shared between threads: allows ``rate`` calls per second with bursts of ``burst``."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str) -> RateLimiter:
+    """Return the limiter for a host, so every caller hitting it shares one budget.
+
+    Each host (e.g. each Wikipedia language edition) has its own budget. The
+    rate defaults to WIKI_REQUESTS_PER_SECOND (20 if unset).
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = RateLimiter(float(os.environ.get("WIKI_REQUESTS_PER_SECOND", "20")))
+            _limiters[host] = limiter
+        return limiter
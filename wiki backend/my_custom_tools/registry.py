@@ -1,24 +1,48 @@
 # my_custom_tools/registry.py
+import importlib
 import sys
 import os
-from portia import InMemoryToolRegistry
+import threading
 sys.path.append(os.path.join(os.path.dirname(__file__), 'my_custom_tools'))
-from my_custom_tools.wikipedia_article_reader_tool import WikipediaArticleReaderTool
-from my_custom_tools.file_writer_tool import FileWriterTool
-from my_custom_tools.file_reader_tool import FileReaderTool
-from my_custom_tools.wikipedia_links_tool import WikipediaLinksTool
-from my_custom_tools.text_to_json_tool import TextToJsonTool
-from my_custom_tools.link_filter_tool import LinkFilterTool
-
-
-# Register the custom tool
-custom_tool_registry = InMemoryToolRegistry.from_local_tools(
-    [
-        WikipediaArticleReaderTool(),
-        FileWriterTool(),
-        FileReaderTool(),
-        WikipediaLinksTool(),
-        TextToJsonTool(),
-        LinkFilterTool()
-    ],
-)
+
+# Tool class name -> module. Modules are imported the first time a class is asked for,
+# so importing the registry doesn't load every tool and its dependencies.
+TOOL_CLASSES = {
+    "WikipediaArticleReaderTool": "my_custom_tools.wikipedia_article_reader_tool",
+    "FileWriterTool": "my_custom_tools.file_writer_tool",
+    "FileReaderTool": "my_custom_tools.file_reader_tool",
+    "WikipediaLinksTool": "my_custom_tools.wikipedia_links_tool",
+    "WikipediaBatchLinksTool": "my_custom_tools.wikipedia_batch_links_tool",
+    "WikipediaLangLinksTool": "my_custom_tools.wikipedia_langlinks_tool",
+    "TextToJsonTool": "my_custom_tools.text_to_json_tool",
+    "LinkFilterTool": "my_custom_tools.link_filter_tool",
+}
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_class(name):
+    """Import and return a tool class by name."""
+    if name not in TOOL_CLASSES:
+        raise KeyError(f"Unknown tool: {name}")
+    return getattr(importlib.import_module(TOOL_CLASSES[name]), name)
+
+
+def get_custom_tool_registry():
+    """Return the registry of custom tools, constructing the tools on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from portia import InMemoryToolRegistry
+            _registry = InMemoryToolRegistry.from_local_tools([get_tool_class(name)() for name in TOOL_CLASSES])
+        return _registry
+
+
+def __getattr__(name):
+    # Keeps `from my_custom_tools.registry import custom_tool_registry` (and the tool classes) working
+    if name == "custom_tool_registry":
+        return get_custom_tool_registry()
+    if name in TOOL_CLASSES:
+        return get_tool_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
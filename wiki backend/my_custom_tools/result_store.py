@@ -0,0 +1,70 @@
+# my_custom_tools/result_store.py
+
+import json
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class ResultStore:
+    """In-memory hand-off of link lists between tools in the same process.
+
+    The links tool puts each result here and the text to json tool reads it
+    back by handle (or by article title), so large lists never pass through a
+    file or through the LLM's output tokens. Lists longer than
+    ``spool_threshold`` are spooled to a temporary file instead of being held
+    in memory, and only the ``max_entries`` most recent results are kept.
+    """
+
+    def __init__(self, max_entries=128, spool_threshold=100000):
+        self.max_entries = max_entries
+        self.spool_threshold = spool_threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # handle -> list or spool file path
+        self._latest = {}  # article title -> handle
+        self._titles = {}  # handle -> article title
+
+    def put(self, article_title: str, links: list[str]) -> str:
+        """Store links fetched for ``article_title`` and return a handle for them."""
+        handle = f"links:{uuid.uuid4().hex}"
+        value = links
+        if len(links) > self.spool_threshold:
+            fd, value = tempfile.mkstemp(prefix="links-", suffix=".jsonl")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(link) + "\n" for link in links)
+        with self._lock:
+            self._entries[handle] = value
+            self._latest[article_title.casefold()] = handle
+            self._titles[handle] = article_title.casefold()
+            while len(self._entries) > self.max_entries:
+                evicted_handle, evicted = self._entries.popitem(last=False)
+                title = self._titles.pop(evicted_handle)
+                if self._latest.get(title) == evicted_handle:
+                    del self._latest[title]
+                self._discard(evicted)
+        return handle
+
+    def get(self, handle: str) -> list[str] | None:
+        with self._lock:
+            value = self._entries.get(handle)
+        if isinstance(value, str):
+            with open(value, "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f]
+        return value
+
+    def latest(self, article_title: str) -> list[str] | None:
+        """The most recent links stored for an article, if still held."""
+        with self._lock:
+            handle = self._latest.get(article_title.casefold())
+        return self.get(handle) if handle else None
+
+    @staticmethod
+    def _discard(value):
+        if isinstance(value, str) and os.path.exists(value):
+            os.remove(value)
+
+
+# Shared by the tools registered in this process
+link_results = ResultStore()
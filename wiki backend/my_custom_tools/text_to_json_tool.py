@@ -1,74 +1,117 @@
 from pathlib import Path
+from typing import Optional
 import json
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.atomic_io import atomic_write_json, locked
+from my_custom_tools.result_store import link_results
+from my_custom_tools.titles import get_title_index
+
+# When the server registers its graph store, merges go through it instead of
+# rewriting graph.json, so there is a single writer for the graph.
+_graph_store = None
+
+
+def use_graph_store(graph_store):
+    """Route TextToJsonTool merges through ``graph_store`` (None to write graph.json directly)."""
+    global _graph_store
+    _graph_store = graph_store
+
+
+def merge_many_article_links(graph: dict, pairs, lang: str = "en") -> dict:
+    """Merge many (article_title, article_lines) pairs of the ``lang`` Wikipedia into ``graph`` in place.
+
+    The merge runs on an in-memory ``GraphStore`` over ``graph``, so names are
+    matched exactly like the server's store does: by language, ignoring case
+    and following redirects already in the title index.
+    """
+    _merge_into(graph, pairs, lang)
+    return graph
+
+
+def _merge_into(graph: dict, pairs, lang: str):
+    """Merge ``pairs`` into ``graph`` in place and return the main node of each pair."""
+    from graph_store import GraphStore
+
+    store = GraphStore(data=graph, titles=get_title_index())
+    main_nodes = store.merge_many_article_links(pairs, lang=lang)
+    graph.update(store.snapshot())
+    return main_nodes
+
+
+def merge_article_links(graph: dict, article_title: str, article_lines: list[str], lang: str = "en") -> dict:
+    """Add the main article and its linked articles to ``graph`` in place."""
+    return merge_many_article_links(graph, [(article_title, article_lines)], lang)
 
 
 class TextToJsonToolSchema(BaseModel):
     """Schema for TextToJsonTool."""
 
     article_title: str = Field(..., description="The main Wikipedia article title (acts as the central node)")
+    links: Optional[list[str]] = Field(
+        None,
+        description="The linked article titles. Leave empty to use the links last fetched or filtered for the article.",
+    )
+    links_handle: Optional[str] = Field(None, description="A handle to links held in memory by another tool.")
+    language: str = Field("en", description="The language edition the articles are from, e.g. 'en', 'de' or 'fr'")
 
 
 class TextToJsonTool(Tool[dict]):
-    """Reads a list of Wikipedia articles from a text file and appends them to a JSON graph."""
+    """Adds a list of Wikipedia articles linked from a main article to a JSON graph."""
 
     id: str = "text_to_json_tool"
     name: str = "Text to JSON Tool"
     description: str = "Creates or updates a JSON graph of Wikipedia articles linked to a main article."
     args_schema: type[BaseModel] = TextToJsonToolSchema
-    output_schema: tuple[str, str] = ("dict", "The updated JSON graph structure.")
+    output_schema: tuple[str, str] = (
+        "dict",
+        "The main article's node id (nodeId) and the number of links added to the graph (linksAdded).",
+    )
 
-    def run(self, _: ToolRunContext, article_title: str) -> dict:
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, article_title: str, links: Optional[list[str]] = None,
+            links_handle: Optional[str] = None, language: str = "en") -> dict:
         """Run the TextToJsonTool."""
         base_path = Path(__file__).resolve().parent
         data_file = base_path.parent / "data.txt"
         json_file = base_path.parent / "graph.json"
 
-        # Read data.txt
-        if not data_file.exists():
-            raise FileNotFoundError(f"{data_file} does not exist.")
-
-        with data_file.open("r", encoding="utf-8") as f:
-            article_lines = [line.strip() for line in f if line.strip()]
-
-        # Load or create JSON graph
-        if json_file.exists():
-            with json_file.open("r", encoding="utf-8") as f:
-                graph = json.load(f)
+        # Prefer links handed over in memory; data.txt is only read as a fallback
+        if links is None and links_handle is not None:
+            links = link_results.get(links_handle)
+        if links is None:
+            links = link_results.latest(article_title)
+        if links is not None:
+            article_lines = [link.strip() for link in links if link.strip()]
+        elif data_file.exists():
+            with data_file.open("r", encoding="utf-8") as f:
+                article_lines = [line.strip() for line in f if line.strip()]
         else:
-            graph = {"nodes": [], "links": []}
+            raise FileNotFoundError(f"No links were given or fetched for '{article_title}' and {data_file} does not exist.")
 
-        existing_ids = {node["name"]: node["id"] for node in graph["nodes"]}
-        next_id = max(existing_ids.values(), default=0) + 1
+        # Only a summary is returned: the whole graph would flood the LLM's context
+        if _graph_store is not None:
+            with _graph_store.batch():
+                before = _graph_store.link_count()
+                main_node = _graph_store.merge_article_links(article_title, article_lines, lang=language)
+                links_added = _graph_store.link_count() - before
+            return {"nodeId": main_node["id"], "linksAdded": links_added}
 
-        # Add main article node if not present
-        if article_title not in existing_ids:
-            main_id = next_id
-            graph["nodes"].append({"id": main_id, "name": article_title})
-            existing_ids[article_title] = main_id
-            next_id += 1
-        else:
-            main_id = existing_ids[article_title]
-
-        # Add article nodes and links
-        for article in article_lines:
-            if article not in existing_ids:
-                graph["nodes"].append({"id": next_id, "name": article})
-                existing_ids[article] = next_id
-                graph["links"].append({"source": main_id, "target": next_id, "label": ""})
-                next_id += 1
+        # Hold the lock across the read-modify-write so concurrent runs don't lose updates
+        with locked(json_file):
+            # Load or create JSON graph
+            if json_file.exists():
+                with json_file.open("r", encoding="utf-8") as f:
+                    graph = json.load(f)
             else:
-                # Create link if not already present
-                existing_link = any(
-                    link["source"] == main_id and link["target"] == existing_ids[article]
-                    for link in graph["links"]
-                )
-                if not existing_link:
-                    graph["links"].append({"source": main_id, "target": existing_ids[article], "label": ""})
-
-        # Save the updated graph
-        with json_file.open("w", encoding="utf-8") as f:
-            json.dump(graph, f, indent=2)
-
-        return graph
+                graph = {"nodes": [], "links": []}
+
+            before = len(graph["links"])
+            main_node = _merge_into(graph, [(article_title, article_lines)], language)[0]
+
+            # Save the updated graph
+            atomic_write_json(json_file, graph)
+            metrics.inc("bytes_written_total", json_file.stat().st_size, target="graph_json")
+
+        return {"nodeId": main_node["id"], "linksAdded": len(graph["links"]) - before}
@@ -0,0 +1,189 @@
+# my_custom_tools/titles.py
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+
+from my_custom_tools import metrics
+from my_custom_tools.http_client import api_url, get_json
+
+# MediaWiki accepts at most 50 titles per query for normal clients
+MAX_TITLES_PER_QUERY = 50
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a title the way MediaWiki does before looking it up.
+
+    Unicode NFC, underscores as spaces, runs of whitespace collapsed and the
+    first letter upper-cased, so "analytic_philosophy" and "Analytic philosophy"
+    are the same title.
+    """
+    title = " ".join(unicodedata.normalize("NFC", title).replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+def title_key(title: str) -> str:
+    """Key for matching node names: the normalized title, ignoring case."""
+    # Same result as normalize_title(title).casefold(), skipping the work plain titles don't need
+    if not title.isascii():
+        title = unicodedata.normalize("NFC", title)
+    if "_" in title:
+        title = title.replace("_", " ")
+    if "  " in title or title[:1].isspace() or title[-1:].isspace() or not title.isprintable():
+        title = " ".join(title.split())
+    return title.casefold()
+
+
+class TitleIndex:
+    """Persistent alias -> canonical title index.
+
+    Every title that has been resolved against MediaWiki is kept here, both
+    redirects ("Analytical philosophy" -> "Analytic philosophy") and titles
+    that are canonical themselves, so each title is resolved at most once.
+    The index lives in a table of the page cache database and is held in
+    memory as dicts, so ``canonical`` and ``variants`` are O(1) lookups.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._canonical = {}  # (lang, normalized title) -> canonical title
+        self._aliases = {}  # (lang, canonical title) -> set of other titles redirecting to it
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS title_aliases (
+                lang TEXT NOT NULL,
+                alias TEXT NOT NULL,
+                canonical TEXT NOT NULL,
+                resolved_at REAL NOT NULL,
+                PRIMARY KEY (lang, alias)
+            )"""
+        )
+        self._db.commit()
+        for lang, alias, canonical in self._db.execute("SELECT lang, alias, canonical FROM title_aliases"):
+            self._remember(lang, alias, canonical)
+
+    def __len__(self):
+        return len(self._canonical)
+
+    def canonical(self, title: str, lang: str = "en") -> str | None:
+        """The canonical title for ``title`` if it has been resolved, else None. Never calls Wikipedia."""
+        canonical = self._canonical.get((lang, title))  # Most titles arrive already normalized
+        if canonical is None:
+            canonical = self._canonical.get((lang, normalize_title(title)))
+        return canonical
+
+    def variants(self, title: str, lang: str = "en") -> list[str]:
+        """The canonical title for ``title`` followed by every known alias of it (just the normalized title if unknown)."""
+        title = normalize_title(title)
+        canonical = self._canonical.get((lang, title), title)
+        with self._lock:  # add() may be growing the alias set on a crawler thread
+            aliases = list(self._aliases.get((lang, canonical), ()))
+        return [canonical, *aliases]
+
+    def add(self, aliases: dict[str, str], lang: str = "en"):
+        """Record ``{title: canonical title}`` pairs, e.g. from the redirects in a query response."""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for alias, canonical in aliases.items():
+                alias, canonical = normalize_title(alias), normalize_title(canonical)
+                for title in (alias, canonical):
+                    if self._canonical.get((lang, title)) != canonical:
+                        self._remember(lang, title, canonical)
+                        rows.append((lang, title, canonical, now))
+            if rows:
+                self._db.executemany("INSERT OR REPLACE INTO title_aliases VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+
+    def resolve(self, titles: list[str], lang: str = "en") -> dict[str, str]:
+        """Return ``{title: canonical title}``, asking MediaWiki about titles not in the index yet.
+
+        Unknown titles are resolved 50 per query. Offline (WIKI_CACHE_OFFLINE)
+        or with WIKI_RESOLVE_REDIRECTS=0, unknown titles map to their
+        normalized form and are not recorded.
+        """
+        from my_custom_tools.page_cache import is_offline
+
+        result = {}
+        unknown = []
+        for title in dict.fromkeys(titles):
+            canonical = self.canonical(title, lang)
+            if canonical is None:
+                unknown.append(title)
+                metrics.inc("cache_misses_total", cache="titles")
+            else:
+                result[title] = canonical
+                metrics.inc("cache_hits_total", cache="titles")
+
+        if unknown and (is_offline() or os.environ.get("WIKI_RESOLVE_REDIRECTS", "1") in ("0", "false")):
+            result.update((title, normalize_title(title)) for title in unknown)
+            return result
+
+        for start in range(0, len(unknown), MAX_TITLES_PER_QUERY):
+            resolved = _query_redirects(unknown[start:start + MAX_TITLES_PER_QUERY], lang)
+            self.add(resolved, lang)
+            result.update(resolved)
+        return result
+
+    def _remember(self, lang, title, canonical):
+        canonical = sys.intern(canonical)
+        previous = self._canonical.get((lang, title))
+        if previous is not None and previous != title:
+            self._aliases.get((lang, previous), set()).discard(title)
+        self._canonical[(lang, title)] = canonical
+        if title != canonical:
+            self._aliases.setdefault((lang, canonical), set()).add(title)
+
+
+def _query_redirects(titles: list[str], lang: str) -> dict[str, str]:
+    """Resolve one batch of titles through MediaWiki's normalization and redirects."""
+    data = get_json(api_url(lang), {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "redirects": "1",
+        "titles": "|".join(titles),
+    })
+    query = data.get("query", {})
+    renamed = {item["from"]: item["to"] for item in query.get("normalized", [])}
+    renamed.update((item["from"], item["to"]) for item in query.get("redirects", []))
+    return {title: follow_redirects(title, renamed) for title in titles}
+
+
+def follow_redirects(title: str, renamed: dict[str, str]) -> str:
+    """Follow ``title`` through a query response's normalized/redirects ``{from: to}`` pairs."""
+    for _ in range(len(renamed) + 1):  # Bounded in case of a redirect loop
+        if title not in renamed:
+            break
+        title = renamed[title]
+    return title
+
+
+_title_index = None
+_title_index_lock = threading.Lock()
+
+
+def get_title_index() -> TitleIndex:
+    """Return the process-wide title index, stored next to the pages in the page cache database."""
+    from my_custom_tools.page_cache import DEFAULT_CACHE_PATH
+
+    global _title_index
+    with _title_index_lock:
+        if _title_index is None:
+            _title_index = TitleIndex(os.environ.get("WIKI_CACHE_PATH", DEFAULT_CACHE_PATH))
+        return _title_index
+
+
+def resolve_titles(titles: list[str], lang: str = "en") -> dict[str, str]:
+    """``{title: canonical title}`` for many titles; see ``TitleIndex.resolve``."""
+    return get_title_index().resolve(titles, lang)
+
+
+def canonical_titles(titles: list[str], lang: str = "en") -> list[str]:
+    """Resolve ``titles`` in bulk and return their canonical titles, without duplicates, in order."""
+    resolved = resolve_titles(titles, lang)
+    return list(dict.fromkeys(resolved[title] for title in titles))
@@ -1,8 +1,28 @@
 # my_custom_tools/wikipedia_article_reader_tool.py
 
-import wikipediaapi as wikipedia_api
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.http_client import api_url, get_json
+from my_custom_tools.page_cache import get_page_cache, is_offline
+
+
+def fetch_article_text(article_title: str, lang: str = "en") -> tuple[str, int] | None:
+    """Return (plain text, revision id) of an article from the MediaWiki API, or None if it does not exist."""
+    data = get_json(api_url(lang), {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "extracts|info",
+        "explaintext": "1",
+        "exsectionformat": "plain",
+        "redirects": "1",
+        "titles": article_title,
+    })
+    pages = data.get("query", {}).get("pages", [])
+    if not pages or pages[0].get("missing") or pages[0].get("invalid"):
+        return None
+    return pages[0].get("extract", ""), pages[0].get("lastrevid")
 
 class WikipediaArticleReaderSchema(BaseModel):
     """Schema defining the inputs for the WikipediaArticleReaderTool."""
@@ -11,6 +31,7 @@ class WikipediaArticleReaderSchema(BaseModel):
         ...,
         description="The title of the Wikipedia article to fetch content from."
     )
+    language: str = Field("en", description="The Wikipedia language edition to use, e.g. 'en', 'de' or 'fr'")
 
 
 class WikipediaArticleReaderTool(Tool[str]):
@@ -25,17 +46,28 @@ class WikipediaArticleReaderTool(Tool[str]):
     args_schema: type[BaseModel] = WikipediaArticleReaderSchema
     output_schema: tuple[str, str] = ("str", "str: full content of the Wikipedia article")
 
-    def run(self, _: ToolRunContext, article_title: str) -> str:
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, article_title: str, language: str = "en") -> str:
         """Run the Wikipedia Article Reader Tool."""
-        # Initialize the Wikipedia API
-        wiki = wikipedia_api.Wikipedia('izaakbot', 'en')
+        # Repeat reads of the same article are served from the shared page cache
+        cache = get_page_cache()
+        entry = cache.get(article_title, language)
+        if entry is not None and entry["exists"] and entry["text"] is not None:
+            return entry["text"]
+        if entry is not None and not entry["exists"]:
+            raise Exception(f"An error occurred while fetching the article: Article '{article_title}' not found.")
+        if is_offline():
+            raise Exception(f"An error occurred while fetching the article: '{article_title}' is not in the page cache.")
 
         try:
-            # Fetch the article
-            page = wiki.page(article_title)
-            if page.exists():
-                return page.text
+            # Fetch the article over the shared keep-alive session
+            page = fetch_article_text(article_title, language)
+            if page is not None:
+                text, revid = page
+                cache.put(article_title, language, text=text, revid=revid)
+                return text
             else:
+                cache.put(article_title, language, exists=False)
                 raise Exception(f"Article '{article_title}' not found.")
         except Exception as e:
             raise Exception(f"An error occurred while fetching the article: {str(e)}")
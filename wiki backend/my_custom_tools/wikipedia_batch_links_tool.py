@@ -0,0 +1,60 @@
+# my_custom_tools/wikipedia_batch_links_tool.py
+
+from pydantic import BaseModel, Field
+from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.page_query import fetch_cached, query_prop
+from my_custom_tools.result_store import link_results
+from my_custom_tools.titles import MAX_TITLES_PER_QUERY
+
+
+def _query_links(titles: list[str], lang: str) -> dict[str, list[str] | None]:
+    """Fetch links for one batch of titles, following continuation for the whole batch.
+
+    Redirects are followed, so a redirect's links are those of its target, and
+    the redirects seen are recorded in the title index.
+    """
+    links = query_prop(titles, lang, "links", plnamespace="0", pllimit="max")
+    return {title: None if found is None else [link["title"] for link in found] for title, found in links.items()}
+
+
+def fetch_links_batch(titles: list[str], lang: str = "en", query=_query_links) -> dict[str, list[str] | None]:
+    """Return a title -> links mapping for many articles; None marks an article that does not exist.
+
+    Titles already in the page cache are served from it; the rest are requested
+    from MediaWiki 50 at a time with ``query`` and written back to the cache
+    (see ``fetch_cached``).
+    """
+    return fetch_cached(titles, lang, "links", query)
+
+
+class WikipediaBatchLinksToolSchema(BaseModel):
+    """Schema defining the inputs for the WikipediaBatchLinksTool."""
+
+    article_titles: list[str] = Field(
+        ...,
+        description="The titles of the Wikipedia articles to get links from. For example, ['Birds of Prey', 'Falcon']",
+    )
+    language: str = Field("en", description="The Wikipedia language edition to use, e.g. 'en', 'de' or 'fr'")
+
+
+class WikipediaBatchLinksTool(Tool[dict[str, list[str]]]):
+    """Retrieves the internal Wikipedia article links from many articles at once."""
+
+    id: str = "wikipedia_batch_links_tool"
+    name: str = "Wikipedia Batch Links Tool"
+    description: str = (
+        "Retrieves the internal Wikipedia article links from several articles in as few requests as possible. "
+        "Use this instead of the Wikipedia Links Tool when you need links for more than one article."
+    )
+    args_schema: type[BaseModel] = WikipediaBatchLinksToolSchema
+    output_schema: tuple[str, str] = ("dict[str, list[str]]", "A mapping of each article title to the titles it links to")
+
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, article_titles: list[str], language: str = "en") -> dict[str, list[str]]:
+        """Run the Wikipedia Batch Links Tool."""
+        links = {title: titles for title, titles in fetch_links_batch(article_titles, language).items()
+                 if titles is not None}
+        for title, titles in links.items():
+            link_results.put(title, titles)
+        return links
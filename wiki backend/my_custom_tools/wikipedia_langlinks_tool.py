@@ -0,0 +1,66 @@
+# my_custom_tools/wikipedia_langlinks_tool.py
+
+from typing import Optional
+from pydantic import BaseModel, Field
+from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.page_query import fetch_cached, query_prop
+
+
+def _query_langlinks(titles: list[str], lang: str) -> dict[str, dict[str, str] | None]:
+    """Fetch the interlanguage links of one batch of titles, following continuation and redirects."""
+    langlinks = query_prop(titles, lang, "langlinks", lllimit="max")
+    return {title: None if found is None else {link["lang"]: link["title"] for link in found}
+            for title, found in langlinks.items()}
+
+
+def fetch_langlinks_batch(titles: list[str], lang: str = "en",
+                          languages: Optional[list[str]] = None) -> dict[str, dict[str, str] | None]:
+    """Return ``{title: {language: title in that language}}`` for articles of the ``lang`` edition.
+
+    None marks an article that does not exist. ``languages`` limits the result
+    to those editions. Like ``fetch_links_batch``, cached pages are served from
+    the page cache and the rest are requested 50 titles at a time.
+    """
+    result = fetch_cached(titles, lang, "langlinks", _query_langlinks)
+    if languages is not None:
+        wanted = set(languages)
+        result = {title: None if found is None else {code: name for code, name in found.items() if code in wanted}
+                  for title, found in result.items()}
+    return result
+
+
+class WikipediaLangLinksToolSchema(BaseModel):
+    """Schema defining the inputs for the WikipediaLangLinksTool."""
+
+    article_title: str = Field(
+        ...,
+        description="The title of the Wikipedia article to find in other languages. For example, 'Philosophy'",
+    )
+    language: str = Field("en", description="The language edition the title is in, e.g. 'en', 'de' or 'fr'")
+    target_languages: Optional[list[str]] = Field(
+        None,
+        description="Only return these language editions, e.g. ['de', 'fr']. Leave empty for all of them.",
+    )
+
+
+class WikipediaLangLinksTool(Tool[dict[str, str]]):
+    """Finds the same article in other Wikipedia language editions."""
+
+    id: str = "wikipedia_langlinks_tool"
+    name: str = "Wikipedia Language Links Tool"
+    description: str = (
+        "Finds the titles of an article in other Wikipedia language editions using its interlanguage links. "
+        "Use the returned titles with the other Wikipedia tools and the matching language."
+    )
+    args_schema: type[BaseModel] = WikipediaLangLinksToolSchema
+    output_schema: tuple[str, str] = ("dict[str, str]", "A mapping of language code to the article title in that language")
+
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, article_title: str, language: str = "en",
+            target_languages: Optional[list[str]] = None) -> dict[str, str]:
+        """Run the Wikipedia Language Links Tool."""
+        langlinks = fetch_langlinks_batch([article_title], language, target_languages)[article_title]
+        if langlinks is None:
+            raise Exception(f"Article '{article_title}' does not exist on the {language} Wikipedia.")
+        return langlinks
@@ -1,8 +1,67 @@
 # my_custom_tools/wikipedia_links_tool.py
 
-import wikipediaapi
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
+from my_custom_tools import metrics
+from my_custom_tools.http_client import api_url, get_json
+from my_custom_tools.result_store import link_results
+from my_custom_tools.titles import follow_redirects, get_title_index
+from my_custom_tools.wikipedia_batch_links_tool import _query_links, fetch_links_batch
+
+
+def _query_canonical_links(titles: list[str], lang: str) -> dict[str, list[str] | None]:
+    """Fetch the links of each title with the link targets' redirects already resolved.
+
+    Uses the linked pages as a generator, so MediaWiki follows redirects on
+    the link targets in the same request: the titles come back canonical and
+    every redirect seen goes into the title index, which then resolves them
+    without another query. One article per query, since generated pages
+    don't say which article linked to them.
+    """
+    index = get_title_index()
+    result = {}
+    for title in titles:
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "generator": "links",
+            "gplnamespace": "0",
+            "gpllimit": "max",
+            "redirects": "1",
+            "titles": title,
+        }
+        renamed = {}
+        links = set()
+        continuation = {}
+        while True:
+            data = get_json(api_url(lang), {**params, **continuation})
+            query = data.get("query", {})
+            renamed.update((item["from"], item["to"]) for item in query.get("normalized", []))
+            renamed.update((item["from"], item["to"]) for item in query.get("redirects", []))
+            links.update(page["title"] for page in query.get("pages", []) if not page.get("invalid"))
+            if "continue" not in data:
+                break
+            continuation = data["continue"]
+
+        if not links:
+            # No linked pages, or no such article: only the plain query tells them apart
+            result.update(_query_links([title], lang))
+            continue
+        index.add({**{link: link for link in links},
+                   **{alias: follow_redirects(alias, renamed) for alias in [title, *renamed]}}, lang)
+        result[title] = sorted(links)
+    return result
+
+
+def fetch_links(article_title: str, lang: str = "en") -> list[str] | None:
+    """Return the canonical titles linked from an article, or None if it does not exist.
+
+    Goes through the page cache and the shared pooled HTTP session (see
+    ``fetch_links_batch``) rather than opening a new wikipedia-api session per call.
+    """
+    return fetch_links_batch([article_title], lang, query=_query_canonical_links)[article_title]
+
 
 class WikipediaLinksToolSchema(BaseModel):
     """Schema defining the inputs for the WikipediaLinksTool."""
@@ -11,6 +70,7 @@ class WikipediaLinksToolSchema(BaseModel):
         ...,
         description="The title of the Wikipedia article to get links from. For example, 'Birds of Prey'",
     )
+    language: str = Field("en", description="The Wikipedia language edition to use, e.g. 'en', 'de' or 'fr'")
 
 class WikipediaLinksTool(Tool[list[str]]):
     """Retrieves all the internal Wikipedia article links from a given article."""
@@ -18,18 +78,22 @@ class WikipediaLinksTool(Tool[list[str]]):
     id: str = "wikipedia_links_tool"
     name: str = "Wikipedia Links Tool"
     description: str = (
-        "Retrieves all the internal Wikipedia article links from a given article using wikipedia-api."
+        "Retrieves all the internal Wikipedia article links from a given article using the MediaWiki API. "
+        "The links are kept in memory, so the Text to JSON Tool and Link Filter Tool can use them "
+        "given just the article title."
     )
     args_schema: type[BaseModel] = WikipediaLinksToolSchema
     output_schema: tuple[str, str] = ("list[str]", "A list of Wikipedia article titles linked from the given article")
 
-    def run(self, _: ToolRunContext, article_title: str) -> list[str]:
+    @metrics.timed_tool_run
+    def run(self, _: ToolRunContext, article_title: str, language: str = "en") -> list[str]:
         """Run the Wikipedia Links Tool."""
 
-        wiki = wikipediaapi.Wikipedia("izaakbot","en")
-        page = wiki.page(article_title)
+        links = fetch_links(article_title, language)
 
-        if not page.exists():
-            return [f"Article '{article_title}' does not exist on Wikipedia."]
+        if links is None:
+            return [f"Article '{article_title}' does not exist on the {language} Wikipedia."]
 
-        return list(page.links.keys())
+        # Keep the list in memory so the next tool can pick it up without it being re-sent
+        link_results.put(article_title, links)
+        return links
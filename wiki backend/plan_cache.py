@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+
+from my_custom_tools import metrics
+from my_custom_tools.atomic_io import atomic_write_text
+
+# The prompt the expand-node endpoint plans when it goes through the LLM
+# (the links are handed between the tools in memory, so nothing is written to data.txt)
+EXPAND_PROMPT_TEMPLATE = (
+    "Get all the links from the wikipedia page for {topic}. Then, add them to the graph with the text "
+    "to json tool, passing only the article title."
+)
+# The same for another language edition; the tools take the language code
+EXPAND_LANG_PROMPT_TEMPLATE = (
+    "Get all the links from the {language} wikipedia page for {topic}. Then, add them to the graph with the "
+    "text to json tool, passing only the article title and the language {language}."
+)
+
+
+def tools_fingerprint(tools):
+    """Hash of everything the planner sees about the tools, so changing a tool invalidates cached plans."""
+    described = sorted(
+        (
+            tool.id,
+            tool.name,
+            tool.description,
+            json.dumps(tool.args_schema.model_json_schema(), sort_keys=True),
+            json.dumps(tool.output_schema),
+        )
+        for tool in tools
+    )
+    return hashlib.sha256(json.dumps(described).encode("utf-8")).hexdigest()
+
+
+def _placeholder(name):
+    return f"__PLAN_PARAM_{name.upper()}__"
+
+
+class PlanCache:
+    """Plans a prompt template once and re-binds the stored plan for new inputs.
+
+    The template is planned with placeholder values; the resulting plan is
+    saved under ``storage_dir/plan_cache`` keyed by the template and the tools
+    fingerprint. Later calls substitute the real values into a copy of the
+    saved plan instead of calling the LLM again. If planning dropped one of the
+    placeholders the plan can't be re-bound, so the template is marked as
+    uncacheable and planned afresh each time.
+    """
+
+    def __init__(self, storage_dir, tools):
+        self.cache_dir = os.path.join(storage_dir, "plan_cache")
+        self.fingerprint = tools_fingerprint(tools)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._remove_stale()
+
+    def plan(self, portia, template, **params):
+        """Return a plan for ``template`` filled in with ``params``."""
+        path = self._path(template)
+        generated = False
+        with self._lock:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    cached = f.read()
+            else:
+                placeholders = {name: _placeholder(name) for name in params}
+                cached = portia.plan(template.format(**placeholders)).model_dump_json()
+                if not all(placeholder in cached for placeholder in placeholders.values()):
+                    cached = ""  # Remember that this template can't be re-bound
+                atomic_write_text(path, cached)
+                generated = True
+
+        if not cached:
+            self.misses += 1
+            metrics.inc("cache_misses_total", cache="plan")
+            return portia.plan(template.format(**params))
+        if generated:
+            self.misses += 1
+            metrics.inc("cache_misses_total", cache="plan")
+        else:
+            self.hits += 1
+            metrics.inc("cache_hits_total", cache="plan")
+
+        from portia.plan import Plan, PlanUUID  # Only needed once a plan is cached; keeps imports light
+
+        for name, value in params.items():
+            # Substitute inside the JSON text, so escape the value as a JSON string body
+            cached = cached.replace(_placeholder(name), json.dumps(str(value))[1:-1])
+        plan = Plan.model_validate_json(cached).model_copy(update={"id": PlanUUID()})
+        portia.storage.save_plan(plan)
+        return plan
+
+    def _path(self, template):
+        template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self.fingerprint[:16]}-{template_hash}.json")
+
+    def _remove_stale(self):
+        """Delete plans cached against a different set of tools."""
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".json") and not filename.startswith(self.fingerprint[:16]):
+                os.remove(os.path.join(self.cache_dir, filename))
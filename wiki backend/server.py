@@ -1,103 +1,347 @@
 from flask_cors import CORS
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import json
 import os
+import threading
 import uuid
-from portia import (
-    Config,
-    LogLevel,
-    Portia,
-    StorageClass,
-    LLMModel,
-)
-from my_custom_tools.registry import custom_tool_registry
+from my_custom_tools import metrics
+from my_custom_tools.http_client import LANGUAGE_CODE
+from my_custom_tools.registry import get_custom_tool_registry
+from my_custom_tools.text_to_json_tool import use_graph_store
+from my_custom_tools.titles import get_title_index
+from graph_store import GraphStore
+from analytics import GraphAnalytics
+from view_reducer import ViewReducer, VIEW_SCORES
+from expansion import expand_article
+from crawler import crawl
+from jobs import JobManager
+from plan_cache import PlanCache, EXPAND_PROMPT_TEMPLATE, EXPAND_LANG_PROMPT_TEMPLATE
 from dotenv import load_dotenv
 import time
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify's encoder, timed as the response_serialize span."""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.span("response_serialize"):
+            return super().dumps(obj, **kwargs)
+
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
 load_dotenv()
 
-# Set up Portia
-my_config = Config.from_default(
-    llm_provider="OPENAI",
-    llm_model_name=LLMModel.GPT_4_O,
-    storage_class=StorageClass.DISK,
-    storage_dir='demo_runs',
-    default_log_level=LogLevel.DEBUG
-)
+# Portia and the plan cache are only needed for LLM expansions, so they are created on first use
+_portia = None
+_plan_cache = None
+_portia_lock = threading.Lock()
+
+def get_portia():
+    """Return the Portia instance, setting it up (LLM client and all tools) on the first call."""
+    global _portia
+    with _portia_lock:
+        if _portia is None:
+            from portia import Config, LogLevel, Portia, StorageClass, LLMModel
+            my_config = Config.from_default(
+                llm_provider="OPENAI",
+                llm_model_name=LLMModel.GPT_4_O,
+                storage_class=StorageClass.DISK,
+                storage_dir='demo_runs',
+                default_log_level=LogLevel.DEBUG
+            )
+            _portia = Portia(config=my_config, tools=get_custom_tool_registry())
+        return _portia
+
+def get_plan_cache():
+    """Plans for the expand prompt are generated once per tool set and re-bound to each topic."""
+    global _plan_cache
+    with _portia_lock:
+        if _plan_cache is None:
+            _plan_cache = PlanCache('demo_runs', get_custom_tool_registry().get_tools())
+        return _plan_cache
+
+# Path to graph.json, which is only imported on first start and exported for the frontend
+GRAPH_JSON_PATH = os.path.abspath(os.environ.get("GRAPH_JSON_PATH") or os.path.join(os.path.dirname(__file__), 'graph.json'))
+# Binary snapshot the graph store loads and saves (GRAPH_SNAPSHOT_PATH overrides it, e.g. for benchmarks)
+GRAPH_SNAPSHOT_PATH = os.path.abspath(os.environ.get("GRAPH_SNAPSHOT_PATH") or os.path.join(os.path.dirname(__file__), 'graph.bin'))
+print(f"Using graph path: {GRAPH_SNAPSHOT_PATH}")
+
+# Process-resident graph: loaded once, writes go to an append-only log next to the snapshot.
+# Names are matched through the persistent redirect index, so aliases share one node.
+graph_store = GraphStore(GRAPH_SNAPSHOT_PATH, import_path=GRAPH_JSON_PATH, titles=get_title_index())
+# The Portia-invoked TextToJsonTool merges through the store instead of rewriting graph.json
+use_graph_store(graph_store)
+
+# PageRank, degrees, components and paths, cached until the graph changes
+analytics = GraphAnalytics(graph_store)
+
+# Chooses which part of the graph the frontend is sent; the store always keeps all of it
+view_reducer = ViewReducer(graph_store, analytics)
+# Number of nodes in the default view
+VIEW_SIZE = int(os.environ.get("GRAPH_VIEW_SIZE", "50"))
+# Other language editions one crawl may fan out to
+MAX_CRAWL_LANGUAGES = 8
+# Most distinct pages one crawl may add (CRAWL_MAX_NODES)
+MAX_CRAWL_NODES = int(os.environ.get("CRAWL_MAX_NODES", "5000"))
+
+# Background expansions; JOB_WORKERS bounds how many run at once
+jobs = JobManager(max_workers=int(os.environ.get("JOB_WORKERS", "4")))
+# Crawls run for minutes, so they get their own workers and can't hold up node clicks
+crawl_jobs = JobManager(max_workers=int(os.environ.get("CRAWL_WORKERS", "2")))
+
+metrics.register_gauge("graph_nodes", lambda: len(graph_store), "Nodes in the graph store")
+metrics.register_gauge("graph_version", lambda: graph_store.version, "Current graph store version")
+metrics.register_gauge("title_aliases", lambda: len(get_title_index()), "Titles in the redirect index")
+
+# Whether POST /api/metrics/profiling may switch profiling on and off; off unless set
+PROFILE_CONTROL = os.environ.get("WIKI_PROFILE_CONTROL", "") not in ("", "0")
+
+@app.before_request
+def start_request_metrics():
+    """Time every request, and profile it with cProfile when profiling is on."""
+    g.request_started = time.perf_counter()
+    if metrics.profiling_enabled():
+        g.profiler = metrics.start_profile()
 
-# Instantiate a Portia instance
-portia = Portia(config=my_config, tools=custom_tool_registry)
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-Path'] = metrics.stop_profile(profiler, endpoint)
+    metrics.observe("span_seconds", time.perf_counter() - g.request_started, span="request", endpoint=endpoint)
+    metrics.inc("http_requests_total", endpoint=endpoint, status=response.status_code)
+    return response
 
-# Path to graph.json
-GRAPH_JSON_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'graph.json'))
-print(f"Using graph path: {GRAPH_JSON_PATH}")
+@app.teardown_request
+def stop_request_profile(error):
+    """Stop a profiler that after_request didn't get to, e.g. after an unhandled exception."""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        metrics.stop_profile(profiler)
 
-# Helper function to load graph data
-def load_graph_data():
+# Helper function to get the graph as sent to the frontend: the top nodes by the score in
+# ?view= (degree, pagerank, recency or focus, with ?focus=<name>) and ?k=, and the links between them.
+# Write endpoints pass the node they touched, which is shown with its neighbours even if it isn't ranked.
+def graph_view(touched=None):
+    by = request.args.get('view', 'degree')
+    if by not in VIEW_SCORES:
+        by = 'degree'
     try:
-        if os.path.exists(GRAPH_JSON_PATH):
-            with open(GRAPH_JSON_PATH, 'r') as f:
-                data = json.load(f)
-                # Convert IDs to integers during loading
-                for node in data["nodes"]:
-                    if isinstance(node["id"], str):
-                        try:
-                            node["id"] = int(node["id"])
-                        except ValueError:
-                            pass  # Keep as string if it's not a valid integer
-                for link in data["links"]:
-                    if isinstance(link["source"], str):
-                        try:
-                            link["source"] = int(link["source"])
-                        except ValueError:
-                            pass
-                    if isinstance(link["target"], str):
-                        try:
-                            link["target"] = int(link["target"])
-                        except ValueError:
-                            pass
-                return data
-        # Return empty graph structure if file doesn't exist
-        return {"nodes": [], "links": []}
-    except Exception as e:
-        print(f"Error loading graph data: {e}")
-        return {"nodes": [], "links": []}
-
-def trim_graph_data(graph_data):
-    """Trim graph data to keep only first 50 nodes and their associated links"""
-    if len(graph_data["nodes"]) > 50:
-        # Keep only first 50 nodes
-        graph_data["nodes"] = [node for node in graph_data["nodes"] if node["id"] <= 50]
-        # Keep only links where both source and target are <= 50
-        graph_data["links"] = [link for link in graph_data["links"] 
-                             if link["source"] <= 50 and link["target"] <= 50]
-    return graph_data
-
-# Helper function to save graph data
-def save_graph_data(data):
+        k = max(int_arg('k', VIEW_SIZE, maximum=10000), 1)
+    except ValueError:
+        k = VIEW_SIZE
+    focus = graph_store.find_node(request.args.get('focus', ''), request.args.get('lang', 'en'))
+    if by == 'focus' and focus is None:
+        by = 'degree'
+    view = view_reducer.view(k=k, by=by, focus=focus["id"] if focus else None)
+    if touched is None:
+        return view
+    around = graph_store.neighborhood(touched, limit=max(k, 1))
+    if around is None:
+        return view
+    ids = [node["id"] for node in view["nodes"]]
+    ids += [node["id"] for node in around["nodes"] if node["id"] not in set(ids)]
+    return graph_store.subgraph(ids)
+
+def graph_update(key, data, touched=None):
+    """Graph payload for write endpoints: the full view under ``key``, or only the
+    changes since the client's version when the request includes ``since``.
+
+    ``touched`` is the id of the node the request added or expanded; the view
+    includes it and its neighbours."""
+    since = data.get('since')
+    if since is not None:
+        try:
+            return {"changes": graph_store.changes_since(int(since))}
+        except (TypeError, ValueError):
+            pass
+    return {key: graph_view(touched), "version": graph_store.version}
+
+def touched_node(topic, data):
+    """Id of the node for ``topic`` after a write, falling back to the nodeId the client sent."""
     try:
-        os.makedirs(os.path.dirname(GRAPH_JSON_PATH), exist_ok=True)
-        # Trim graph before saving
-        data = trim_graph_data(data)
-        with open(GRAPH_JSON_PATH, 'w') as f:
-            json.dump(data, f, indent=2)
-        return True
-    except Exception as e:
-        print(f"Error saving graph data: {e}")
-        return False
+        node = graph_store.find_node(topic, parse_lang(data.get('lang')))
+    except ValueError:
+        node = None
+    return node["id"] if node is not None else data.get('nodeId')
+
+def wants_ndjson():
+    return request.args.get('format') == 'ndjson'
+
+def ndjson_response(records):
+    """Stream an iterable of dicts as newline-delimited JSON, one record per line."""
+    return Response((json.dumps(record) + "\n" for record in records), mimetype='application/x-ndjson')
+
+def graph_records(graph_data):
+    """NDJSON records for a graph: {"record": "node" or "link", "data": <the node or link>}.
+
+    The item goes under "data" so that its own fields, such as a node's "type",
+    can't clash with the record kind."""
+    for node in graph_data["nodes"]:
+        yield {"record": "node", "data": node}
+    for link in graph_data["links"]:
+        yield {"record": "link", "data": link}
+
+def stream_full_graph(page_size=1000):
+    """Yield every node, then every link, one page at a time so the store is never copied whole."""
+    for kind, page in (("node", graph_store.page_nodes), ("link", graph_store.page_links)):
+        cursor = 0
+        while cursor is not None:
+            items, cursor = page(cursor, page_size)
+            for item in items:
+                yield {"record": kind, "data": item}
+
+def int_arg(name, default, maximum=None):
+    value = int(request.args.get(name, default))
+    if maximum is not None:
+        value = min(value, maximum)
+    return max(value, 0)
+
+def parse_lang(value):
+    """A Wikipedia language code from a request ("en" if not given). Raises ValueError."""
+    lang = value or 'en'
+    if not isinstance(lang, str) or not LANGUAGE_CODE.fullmatch(lang):
+        raise ValueError(f"Invalid language code: {value!r}")
+    return lang
 
 @app.route('/api/get-graph', methods=['GET'])
 def get_graph():
-    """Endpoint to get the current graph data"""
-    print("API get-graph called, path:", GRAPH_JSON_PATH)
-    print("File exists:", os.path.exists(GRAPH_JSON_PATH))
-    data = load_graph_data()
-    print("Loaded data:", data)
-    return jsonify(data)
+    """Endpoint to get the current graph data. With ?format=ndjson the full graph is streamed."""
+    if wants_ndjson():
+        return ndjson_response(stream_full_graph())
+    return jsonify(graph_view())
+
+@app.route('/api/graph/changes', methods=['GET'])
+def get_graph_changes():
+    """Nodes and links added or changed since the client's version (?since=).
+
+    If the server no longer has the changes since that version, the whole graph
+    is returned with "full": true and the client should replace its copy.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "since must be an integer"}), 400
+    return jsonify(graph_store.changes_since(since))
+
+@app.route('/api/graph/neighborhood', methods=['GET'])
+def get_neighborhood():
+    """Nodes within k hops of a node, given by nodeId or name."""
+    node = graph_store.get_node(request.args['nodeId']) if 'nodeId' in request.args else None
+    if node is None and 'name' in request.args:
+        node = graph_store.find_node(request.args['name'], request.args.get('lang', 'en'))
+    if node is None:
+        return jsonify({"error": "Node not found"}), 404
+    try:
+        hops = int_arg('hops', 1, maximum=5)
+        limit = int_arg('limit', 500, maximum=10000)
+    except ValueError:
+        return jsonify({"error": "hops and limit must be integers"}), 400
+
+    subgraph = graph_store.neighborhood(node["id"], hops=hops, limit=limit)
+    if wants_ndjson():
+        return ndjson_response(graph_records(subgraph))
+    return jsonify(subgraph)
+
+@app.route('/api/graph/top', methods=['GET'])
+def get_top_nodes():
+    """The n best connected nodes and the links between them."""
+    try:
+        n = int_arg('n', 50, maximum=10000)
+    except ValueError:
+        return jsonify({"error": "n must be an integer"}), 400
+
+    subgraph = graph_store.top_by_degree(n)
+    if wants_ndjson():
+        return ndjson_response(graph_records(subgraph))
+    return jsonify(subgraph)
+
+@app.route('/api/graph/nodes', methods=['GET'])
+@app.route('/api/graph/links', methods=['GET'])
+def get_graph_page():
+    """Cursor-paginated node or link lists. Pass the returned nextCursor to get the next page."""
+    try:
+        cursor = int_arg('cursor', 0)
+        limit = int_arg('limit', 1000, maximum=50000)
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+    if limit < 1:
+        # An empty page would hand back the same cursor and clients would never finish
+        return jsonify({"error": "limit must be at least 1"}), 400
+
+    kind = 'nodes' if request.path.endswith('/nodes') else 'links'
+    page = graph_store.page_nodes if kind == 'nodes' else graph_store.page_links
+    items, next_cursor = page(cursor, limit)
+    if wants_ndjson():
+        records = [{"record": kind[:-1], "data": item} for item in items]
+        return ndjson_response(records + [{"record": "cursor", "nextCursor": next_cursor}])
+    return jsonify({kind: items, "nextCursor": next_cursor})
+
+def ranked_nodes(scores, n, key):
+    """The n highest scoring nodes, each with its score under ``key``."""
+    ranked = []
+    for node_id, score in analytics.top(scores, n):
+        node = graph_store.get_node(node_id)
+        if node is not None:
+            ranked.append({**node, key: score})
+    return ranked
+
+@app.route('/api/analytics/pagerank', methods=['GET'])
+def get_pagerank():
+    """The n most central nodes by PageRank."""
+    try:
+        n = int_arg('n', 50, maximum=10000)
+    except ValueError:
+        return jsonify({"error": "n must be an integer"}), 400
+    return jsonify({"version": graph_store.version, "nodes": ranked_nodes(analytics.pagerank(), n, "pagerank")})
+
+@app.route('/api/analytics/degree', methods=['GET'])
+def get_degree_centrality():
+    """The n nodes with the highest degree centrality."""
+    try:
+        n = int_arg('n', 50, maximum=10000)
+    except ValueError:
+        return jsonify({"error": "n must be an integer"}), 400
+    nodes = ranked_nodes(analytics.degree_centrality(), n, "centrality")
+    degrees = analytics.degrees()
+    for node in nodes:
+        node["degree"] = degrees[node["id"]]
+    return jsonify({"version": graph_store.version, "nodes": nodes})
+
+@app.route('/api/analytics/components', methods=['GET'])
+def get_components():
+    """Number of connected components and the n largest, with up to `sample` nodes from each."""
+    try:
+        n = int_arg('n', 10, maximum=1000)
+        sample = int_arg('sample', 10, maximum=1000)
+    except ValueError:
+        return jsonify({"error": "n and sample must be integers"}), 400
+    components = analytics.components()
+    return jsonify({
+        "version": graph_store.version,
+        "count": len(components),
+        "components": [
+            {"size": len(component), "nodes": [graph_store.get_node(node_id) for node_id in component[:sample]]}
+            for component in components[:n]
+        ],
+    })
+
+@app.route('/api/analytics/path', methods=['GET'])
+def get_shortest_path():
+    """A shortest path between two topics (?from=&to=, by name), following links either way."""
+    lang = request.args.get('lang', 'en')
+    source = graph_store.find_node(request.args.get('from', ''), lang)
+    target = graph_store.find_node(request.args.get('to', ''), lang)
+    if source is None or target is None:
+        return jsonify({"error": "Node not found"}), 404
+    path = analytics.shortest_path(source["id"], target["id"])
+    if path is None:
+        return jsonify({"error": f"No path between {source['name']} and {target['name']}"}), 404
+    return jsonify({"version": graph_store.version, "path": path, **graph_store.subgraph(path)})
 
 @app.route('/api/add-node', methods=['POST'])
 def add_node():
@@ -107,128 +351,250 @@ def add_node():
     
     if not topic:
         return jsonify({"error": "No topic provided"}), 400
-    
-    # Load current graph
-    graph_data = load_graph_data()
+    try:
+        lang = parse_lang(data.get('lang'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Check if node already exists
-    existing_node = next((node for node in graph_data["nodes"] if node["name"].lower() == topic.lower()), None)
+    existing_node = graph_store.find_node(topic, lang)
     
     if existing_node:
-        return jsonify({"message": "Node already exists", "nodeId": existing_node["id"], "graph": graph_data})
+        return jsonify({"message": "Node already exists", "nodeId": existing_node["id"],
+                        **graph_update("graph", data, existing_node["id"])})
     
     # Create new node
-    new_node_id = len(graph_data['nodes']) + 1  # Use an integer ID
-    new_node = {
-        "id": new_node_id,
-        "name": topic,
-        "description": f"Topic: {topic}",
-        "type": "topic"
-    }
+    new_node = graph_store.add_node(topic, description=f"Topic: {topic}", type="topic", lang=lang)
     
-    # Add to graph
-    graph_data["nodes"].append(new_node)
-    
-    # Save updated graph
-    save_graph_data(graph_data)
-    
-    return jsonify({"message": "Node added successfully", "nodeId": new_node_id, "graph": graph_data})
+    return jsonify({"message": "Node added successfully", "nodeId": new_node["id"],
+                    **graph_update("graph", data, new_node["id"])})
+
+def count_plan_retry(retry_state):
+    print(f"Retrying Portia plan after attempt {retry_state.attempt_number} failed: {retry_state.outcome.exception()}")
+    metrics.inc("portia_plan_retries_total")
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.2, min=0.2, max=1))
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.2, min=0.2, max=1),
+       before_sleep=count_plan_retry)
 def run_portia_plan(plan):
-    return portia.run_plan(plan)
+    return get_portia().run_plan(plan)
+
+def expand_with_portia(topic, prompt=None, lang="en"):
+    """Expand a topic by planning and running a Portia plan. Returns Portia's output."""
+    # 1. Generate a plan for Portia to find related information.
+    portia = get_portia()
+    with metrics.span("plan"):
+        if prompt:
+            plan = portia.plan(prompt)
+        elif lang != "en":
+            plan = get_plan_cache().plan(portia, EXPAND_LANG_PROMPT_TEMPLATE, topic=topic, language=lang)
+        else:
+            plan = get_plan_cache().plan(portia, EXPAND_PROMPT_TEMPLATE, topic=topic)
+
+    # 2. Run the plan. TextToJsonTool merges through the graph store, which is the only writer.
+    with metrics.span("plan_run"):
+        plan_run = run_portia_plan(plan)
+
+    # 3. Extract the relevant information from Portia's output.
+    final_output = plan_run.outputs.final_output
+    portia_output = str(final_output)  # Convert LocalOutput to string first
+
+    # 4.  Create a new node for the expanded topic if it doesn't exist
+    existing_node = graph_store.find_node(topic, lang)
+
+    if not existing_node:
+        new_node = graph_store.add_node(topic, description=portia_output, type="topic", lang=lang)
+        node_id_to_use = new_node["id"]
+    else:
+        node_id_to_use = existing_node["id"]
+        graph_store.update_node(node_id_to_use, description=portia_output)
+
+    # 5. Add new nodes and links based on Portia's output.
+    final_value = final_output.get_value() if final_output else None
+    related_topics = final_value.get("related_topics", []) if isinstance(final_value, dict) else []
+
+    for related_topic_name in related_topics:
+        # Reuses the existing node if there is one with this name.
+        related_node = graph_store.add_node(related_topic_name, description=f"Related to {topic}", type="topic", lang=lang)
+        graph_store.add_link(node_id_to_use, related_node["id"], label="related to")
+
+    return portia_output
+
+def run_expansion(topic, prompt=None, mode=None, lang="en"):
+    """Expand a topic of the ``lang`` Wikipedia and return the node info. Raises LookupError if the article doesn't exist."""
+    # Plain "expand this article" clicks don't need the LLM: fetch and merge the links directly.
+    if prompt is None and mode != 'llm':
+        node_info = expand_article(graph_store, topic, lang)
+        if node_info is None:
+            raise LookupError(f"Article '{topic}' does not exist on the {lang} Wikipedia.")
+        return node_info
+    return expand_with_portia(topic, prompt, lang)
+
+def parse_crawl_args(data):
+    """Validated crawl keyword arguments from a request body. Raises ValueError."""
+    languages = data.get('languages') or []
+    if not isinstance(languages, list) or len(languages) > MAX_CRAWL_LANGUAGES:
+        raise ValueError(f"languages must be a list of at most {MAX_CRAWL_LANGUAGES} language codes")
+    try:
+        numbers = {
+            "depth": min(int(data.get('depth', 2)), 5),
+            "max_nodes": max(1, min(int(data.get('maxNodes', 500)), MAX_CRAWL_NODES)),
+            "max_in_flight": max(1, min(int(data.get('concurrency', 8)), 32)),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("depth, maxNodes and concurrency must be integers")
+    return {
+        **numbers,
+        "lang": parse_lang(data.get('lang')),
+        "languages": tuple(parse_lang(code) for code in languages),
+    }
+
+def check_strings(data, *names):
+    """Raise ValueError unless each of ``names`` in a request body is a string or not given."""
+    for name in names:
+        if data.get(name) is not None and not isinstance(data[name], str):
+            raise ValueError(f"{name} must be a string")
+
+def submit_job(kind, topic, data):
+    """Queue an expansion or crawl. Requests for the same topic and options share one job. Raises ValueError."""
+    # The options end up in the coalescing key, so they must be hashable
+    if kind == 'crawl':
+        check_strings(data, 'topic')
+        crawl_args = parse_crawl_args(data)
+        key = (topic.casefold(), tuple(sorted(crawl_args.items())))
+        return crawl_jobs.submit(kind, key, lambda report: {
+            "levels": crawl(graph_store, topic, on_level=report, **crawl_args)
+        })
+    check_strings(data, 'topic', 'prompt', 'mode')
+    prompt, mode, lang = data.get('prompt'), data.get('mode'), parse_lang(data.get('lang'))
+    key = (lang, topic.casefold(), prompt, mode)
+    return jobs.submit(kind, key, lambda report: {"nodeInfo": run_expansion(topic, prompt, mode, lang)})
+
+def job_manager(job_id):
+    """The manager running the job with ``job_id``, or None if neither knows it."""
+    for manager in (jobs, crawl_jobs):
+        if manager.get(job_id) is not None:
+            return manager
+    return None
+
+def job_accepted(job):
+    return jsonify({"jobId": job["id"], **job}), 202
 
 @app.route('/api/expand-node', methods=['POST'])
 def expand_node():
-    """Generate content about a specific topic when node is clicked, and update the graph."""
+    """Generate content about a specific topic when node is clicked, and update the graph.
+
+    With "async": true the expansion runs as a background job and a job id is
+    returned straight away; poll /api/jobs/<id> or stream /api/jobs/<id>/events.
+    Without it the request waits for the expansion and returns the updated graph.
+    """
     data = request.json
     topic = data.get('topic')
-    node_id = data.get('nodeId')
 
     if not topic:
         return jsonify({"error": "No topic provided"}), 400
 
     try:
-        # 1. Generate a plan for Portia to find related information.
-        plan = portia.plan(f"Get all the links from the wikipedia page for {topic}. Save them to data.txt. Then, transform this into a json and store the result as graph.json. Remember to correctly indent them (with 2 spaces)")
+        job = submit_job('expand', topic, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if data.get('async'):
+        return job_accepted(job)
 
-        # 2. Run the plan.
-        plan_run = run_portia_plan(plan)
+    # Even synchronous clicks run as jobs, so simultaneous clicks on one topic share a fetch
+    job = jobs.wait(job["id"])
+    if job["status"] == "failed":
+        status = 404 if job["errorType"] == "LookupError" else 500
+        return jsonify({"error": job["error"]}), status
+    node_info = job["result"]["nodeInfo"]
 
-        # 3. Extract the relevant information from Portia's output.
-        portia_output = str(plan_run.outputs.final_output)  # Convert LocalOutput to string first
-
-        # 4. Load the current graph data.
-        graph_data = load_graph_data()
-
-        # 5.  Create a new node for the expanded topic if it doesn't exist
-        existing_node = next((node for node in graph_data["nodes"] if node["name"].lower() == topic.lower()), None)
-
-        if not existing_node:
-            new_node_id = len(graph_data['nodes']) + 1 #changed to int
-            new_node = {
-                "id": new_node_id,
-                "name": topic,
-                "description": portia_output,
-                "type": "topic"
-            }
-            graph_data["nodes"].append(new_node)
-            node_id_to_use = new_node_id
-        else:
-            node_id_to_use = existing_node["id"]
-            existing_node["description"] = portia_output
-
-        # 6. Add new nodes and links based on Portia's output.
-        related_topics = portia_output.get("related_topics", [])
-
-        for related_topic_name in related_topics:
-            # Check if the related topic node already exists.
-            related_node = next((node for node in graph_data["nodes"] if node["name"].lower() == related_topic_name.lower()), None)
-            if not related_node:
-                # If it doesn't exist, create a new node for it.
-                new_related_node_id = len(graph_data['nodes']) + 1 #changed to int
-                new_related_node = {
-                    "id": new_related_node_id,
-                    "name": related_topic_name,
-                    "description": f"Related to {topic}",
-                    "type": "topic"
-                }
-                graph_data["nodes"].append(new_related_node)
-                # Create a link between the original node and the new related node.
-                graph_data["links"].append({
-                    "source": int(node_id_to_use), #changed to int
-                    "target": int(new_related_node_id), #changed to int
-                    "label": "related to"
-                })
-            else:
-                graph_data["links"].append({
-                    "source": int(node_id_to_use), #changed to int
-                    "target": int(related_node["id"]), #changed to int
-                    "label": "related to"
-                })
-
-        # 7. Save the updated graph data.
-        save_result = save_graph_data(graph_data)
-        if not save_result:
-            return jsonify({"error": "Failed to save updated graph data."}), 500  # Return 500 error
-
-        # 8. Return the updated graph data.
-        return jsonify({
-            "message": "Node expanded successfully",
-            "nodeInfo": portia_output,
-            "updatedGraph": graph_data
-        })
+    # Return the updated graph data.
+    return jsonify({
+        "message": "Node expanded successfully",
+        "nodeInfo": node_info,
+        **graph_update("updatedGraph", data, touched_node(topic, data))
+    })
+
+@app.route('/api/crawl', methods=['POST'])
+def crawl_topic():
+    """Expand a topic several hops deep. Accepts "async": true like expand-node."""
+    data = request.json
+    topic = data.get('topic')
+
+    if not topic:
+        return jsonify({"error": "No topic provided"}), 400
+
+    try:
+        check_strings(data, 'topic')
+        crawl_args = parse_crawl_args(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    if data.get('async'):
+        return job_accepted(submit_job('crawl', topic, data))
+
+    try:
+        levels = crawl(graph_store, topic, **crawl_args)
     except Exception as e:
-        print(f"Error expanding node with Portia: {e}")
-        return jsonify({"error": str(e)}), 500  # Return 500 Internal Server Error
+        print(f"Error crawling from {topic}: {e}")
+        metrics.inc("errors_total", source="crawl")
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({
+        "message": "Crawl finished",
+        "levels": levels,
+        **graph_update("updatedGraph", data, touched_node(topic, data))
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a background job, with its result once it is done."""
+    manager = job_manager(job_id)
+    if manager is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(manager.get(job_id))
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    """Server-sent events with a job's progress, ending when the job finishes."""
+    manager = job_manager(job_id)
+    if manager is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        for event in manager.events(job_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"data: {json.dumps(event)}\n\n"
+
+    return Response(stream(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Counters and timing histograms in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profiling', methods=['GET', 'POST'])
+def profiling():
+    """Turn per-request cProfile dumps on or off with {"enabled": true|false}.
+
+    Only allowed when the server runs with WIKI_PROFILE_CONTROL=1; WIKI_PROFILE=1
+    turns profiling on from the start. Profiles are written to WIKI_PROFILE_DIR
+    (default ./profiles), one .prof file per request, keeping the newest
+    WIKI_PROFILE_KEEP; the response's X-Profile-Path header names it.
+    """
+    if request.method == 'POST':
+        if not PROFILE_CONTROL:
+            return jsonify({"error": "Profiling control is disabled; start the server with WIKI_PROFILE_CONTROL=1"}), 403
+        metrics.set_profiling((request.json or {}).get('enabled', False))
+    return jsonify({"enabled": metrics.profiling_enabled(), "directory": metrics.profile_dir()})
 
 if __name__ == '__main__':
     # Ensure graph file exists
-    if not os.path.exists(os.path.dirname(GRAPH_JSON_PATH)):
-        os.makedirs(os.path.dirname(GRAPH_JSON_PATH), exist_ok=True)
-    if not os.path.exists(GRAPH_JSON_PATH):
-        save_graph_data({"nodes": [], "links": []})
+    if not os.path.exists(os.path.dirname(GRAPH_SNAPSHOT_PATH)):
+        os.makedirs(os.path.dirname(GRAPH_SNAPSHOT_PATH), exist_ok=True)
+    if not os.path.exists(GRAPH_SNAPSHOT_PATH):
+        graph_store.compact()
 
-    print(f"Graph JSON path: {os.path.abspath(GRAPH_JSON_PATH)}")
+    print(f"Graph snapshot path: {GRAPH_SNAPSHOT_PATH}")
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The backend's modules are imported by their top-level names, as server.py does
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    """Point the shared page cache and title index at a fresh database."""
+    from my_custom_tools import page_cache, titles
+
+    path = tmp_path / "cache.sqlite3"
+    monkeypatch.setenv("WIKI_CACHE_PATH", str(path))
+    monkeypatch.setattr(page_cache, "_page_cache", None)
+    monkeypatch.setattr(titles, "_title_index", None)
+    return path
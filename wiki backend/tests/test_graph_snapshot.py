@@ -0,0 +1,31 @@
+from graph_snapshot import is_binary_snapshot, load_snapshot, read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trip_keeps_order_and_fields(tmp_path):
+    path = str(tmp_path / "graph.bin")
+    nodes = [
+        {"id": 5, "name": "Zen", "type": "topic", "description": "Topic: Zen"},
+        {"id": 2, "name": "Thema AA", "lang": "de"},
+        {"id": 9, "name": "Ethics"},
+    ]
+    links = [
+        {"source": 9, "target": 5, "label": ""},
+        {"source": 5, "target": 2, "label": "langlink"},
+        {"source": 5, "target": 9, "label": "related to", "weight": 2},
+        {"source": 2, "target": 9},
+    ]
+    write_snapshot(path, nodes, links)
+
+    assert is_binary_snapshot(path)
+    assert load_snapshot(path) == (nodes, links)
+
+
+def test_read_snapshot_builds_adjacency(tmp_path):
+    path = str(tmp_path / "graph.bin")
+    write_snapshot(path, [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}],
+                   [{"source": 1, "target": 2, "label": ""}])
+
+    graph = read_snapshot(path)
+    assert graph.has_link(1, 2) and not graph.has_link(2, 1)
+    assert list(graph.targets(1)) == [2] and list(graph.sources(2)) == [1]
+    assert graph.find("a")["id"] == 1
@@ -0,0 +1,106 @@
+import os
+
+from graph_store import GraphStore
+
+
+def make_store(tmp_path, **kwargs):
+    return GraphStore(str(tmp_path / "graph.bin"), **kwargs)
+
+
+def test_log_replay_after_torn_line(tmp_path):
+    store = make_store(tmp_path)
+    a = store.add_node("A")
+    b = store.add_node("B")
+    store.add_link(a["id"], b["id"], "see also")
+    store.close()
+    # A crash in the middle of a log write leaves a partial last line
+    with open(store.log_path, "a") as f:
+        f.write('{"op": "add_node", "node": {"id": 9')
+
+    store = make_store(tmp_path)
+    assert len(store) == 2 and store.has_link(a["id"], b["id"])
+    c = store.add_node("C")
+    store.close()
+
+    # The entry written after the torn line is replayed too
+    store = make_store(tmp_path)
+    assert store.get_node(c["id"])["name"] == "C"
+    assert len(store) == 3
+    store.close()
+
+
+def test_changes_since_returns_only_new_writes(tmp_path):
+    store = make_store(tmp_path)
+    a = store.add_node("A")
+    version = store.version
+    b = store.add_node("B")
+    store.add_link(a["id"], b["id"])
+
+    changes = store.changes_since(version)
+    assert not changes["full"]
+    assert [node["name"] for node in changes["nodes"]] == ["B"]
+    assert changes["links"] == [{"source": a["id"], "target": b["id"], "label": ""}]
+    assert changes["version"] == store.version
+    store.close()
+
+
+def test_changes_since_falls_back_to_the_whole_graph(tmp_path):
+    store = make_store(tmp_path, max_changes=2)
+    store.add_node("A")
+    version = store.version
+    for name in ("B", "C", "D"):
+        store.add_node(name)
+
+    # The change log no longer reaches back to ``version``
+    changes = store.changes_since(version)
+    assert changes["full"] and len(changes["nodes"]) == 4
+    assert store.changes_since(version, full=False) is None
+    store.close()
+
+    # Versions from before a restart aren't covered either
+    store = make_store(tmp_path)
+    assert store.changes_since(version)["full"]
+    store.close()
+
+
+def test_compacted_snapshot_round_trip(tmp_path):
+    store = make_store(tmp_path, compact_min_bytes=1 << 30)
+    zen = store.add_node("Zen", type="topic", description="A school of Buddhism")
+    ethics = store.add_node("Ethik", lang="de")
+    store.add_link(zen["id"], ethics["id"], "langlink")
+    store.add_link(ethics["id"], zen["id"])
+    store.update_node(zen["id"], description="Updated")
+    before = store.snapshot()
+    store.compact()
+    store.close()
+    assert not os.path.exists(store.log_path)
+
+    store = make_store(tmp_path)
+    assert store.snapshot() == before
+    assert store.page_nodes(0, 1) == ([before["nodes"][0]], 1)
+    assert store.find_node("ethik", "de")["id"] == ethics["id"]
+    assert store.find_node("Ethik") is None
+    store.close()
+
+
+def test_compaction_keeps_queued_writes_if_it_crashes(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.add_node("A")
+    # A write that is queued but not flushed yet when the compaction starts
+    with store._lock:
+        store._batch_depth += 1
+        queued = store.add_node("Queued")
+        store._batch_depth -= 1
+
+    def crash(copy=None):
+        raise OSError("crashed before the snapshot was written")
+
+    monkeypatch.setattr(store, "_write_snapshot", crash)
+    try:
+        store.compact()
+    except OSError:
+        pass
+
+    reopened = make_store(tmp_path)
+    assert reopened.get_node(queued["id"])["name"] == "Queued"
+    reopened.close()
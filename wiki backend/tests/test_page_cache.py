@@ -0,0 +1,48 @@
+import pytest
+
+from my_custom_tools.page_cache import PageCache, get_page_cache
+
+
+def test_put_then_get_hits_memory(tmp_path):
+    cache = PageCache(tmp_path / "cache.sqlite3")
+    cache.put("Philosophy", links=["Ethics", "Logic"])
+
+    entry = cache.get("philosophy ")
+    assert entry["exists"] and entry["links"] == ["Ethics", "Logic"]
+    assert (cache.hits, cache.memory_hits, cache.misses) == (1, 1, 0)
+
+
+def test_entries_survive_restart(tmp_path):
+    PageCache(tmp_path / "cache.sqlite3").put("Philosophy", lang="de", links=["Ethik"])
+
+    cache = PageCache(tmp_path / "cache.sqlite3")
+    assert cache.get("Philosophy", lang="de")["links"] == ["Ethik"]
+    assert cache.get("Philosophy") is None
+    assert (cache.hits, cache.memory_hits, cache.misses) == (1, 0, 1)
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = PageCache(tmp_path / "cache.sqlite3", ttl=-1)
+    cache.put("Philosophy", links=[])
+    assert cache.get("Philosophy") is None
+
+
+def test_put_keeps_fields_of_the_same_revision(tmp_path):
+    cache = PageCache(tmp_path / "cache.sqlite3")
+    cache.put("Philosophy", text="Love of wisdom", revid=7)
+    cache.put("Philosophy", links=["Ethics"], revid=7)
+    entry = cache.get("Philosophy")
+    assert (entry["text"], entry["links"]) == ("Love of wisdom", ["Ethics"])
+
+
+def test_offline_links_come_from_the_cache(cache_path, monkeypatch):
+    pytest.importorskip("portia")
+    from my_custom_tools.wikipedia_batch_links_tool import fetch_links_batch
+
+    monkeypatch.setenv("WIKI_CACHE_OFFLINE", "1")
+    get_page_cache().put("Philosophy", links=["Ethics"])
+    get_page_cache().put("Nowhere", exists=False)
+
+    assert fetch_links_batch(["philosophy", "Nowhere"]) == {"philosophy": ["Ethics"], "Nowhere": None}
+    with pytest.raises(LookupError):
+        fetch_links_batch(["Not cached"])
@@ -0,0 +1,22 @@
+import json
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import my_custom_tools.registry
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "heavy": [m for m in ("pandas", "numpy", "scipy") if m in sys.modules]}))
+"""
+
+
+def test_registry_import_is_light():
+    """Same check as benchmarks/bench_startup.py for the tools registry: no heavy imports, well under budget."""
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    assert probe["heavy"] == []
+    assert probe["seconds"] < 3.0
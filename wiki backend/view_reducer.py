@@ -0,0 +1,144 @@
+import heapq
+import threading
+from collections import Counter, OrderedDict
+
+VIEW_SCORES = ("degree", "pagerank", "recency", "focus")
+
+
+class TopK:
+    """The ``k`` highest scoring items, kept up to date as scores rise.
+
+    A min-heap holds the current members, so an update only has to compare
+    against the weakest member. Superseded heap entries are skipped lazily.
+    Scores may only increase, which holds for degree and recency: an item
+    outside the top K can only get in by having its score raised.
+    """
+
+    def __init__(self, k, scores):
+        self.k = k
+        self._members = dict(heapq.nlargest(k, scores.items(), key=lambda item: item[1]))
+        self._heap = [(score, item) for item, score in self._members.items()]
+        heapq.heapify(self._heap)
+
+    def update(self, item, score):
+        if self.k <= 0:
+            return
+        if item in self._members:
+            self._members[item] = score
+        elif len(self._members) < self.k:
+            self._members[item] = score
+        else:
+            self._drop_stale()
+            if not self._heap or score <= self._heap[0][0]:
+                return
+            _, evicted = heapq.heappop(self._heap)
+            del self._members[evicted]
+            self._members[item] = score
+        heapq.heappush(self._heap, (score, item))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(score, item) for item, score in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def _drop_stale(self):
+        while self._heap and self._members.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def items(self):
+        """Members, highest score first."""
+        return sorted(self._members, key=self._members.get, reverse=True)
+
+
+class ViewReducer:
+    """Picks the part of the graph to send to the frontend without touching the stored graph.
+
+    A view is the top ``k`` nodes by a score plus the links between them:
+
+        degree:   best connected nodes
+        pagerank: most central nodes by PageRank
+        recency:  most recently added nodes
+        focus:    nodes closest to a focused node
+
+    Degree and recency views are maintained incrementally: each call applies
+    the store's changes since the previous call to per-node degrees and to a
+    ``TopK`` heap per (score, k), instead of ranking the whole graph again.
+    """
+
+    def __init__(self, graph_store, analytics, max_tracked=8):
+        self.graph_store = graph_store
+        self.analytics = analytics
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._version = None
+        self._degree = Counter()
+        self._tracked = OrderedDict()  # (score, k) -> TopK
+
+    def view(self, k=50, by="degree", focus=None):
+        """Return {"nodes", "links"} for the top ``k`` nodes by ``by``.
+
+        ``focus`` is the node id the "focus" view is centred on.
+        """
+        if by == "focus":
+            if focus is None or not self.graph_store.has_node(focus):
+                raise KeyError("The focus view needs an existing focus node")
+            return self.graph_store.neighborhood(focus, hops=k, limit=k)
+        if by == "pagerank":
+            ranked = self.analytics.top(self.analytics.pagerank(), k)
+            return self.graph_store.subgraph(node_id for node_id, _ in ranked)
+        if by not in VIEW_SCORES:
+            raise ValueError(f"Unknown view score {by!r}; expected one of {', '.join(VIEW_SCORES)}")
+
+        with self._lock:
+            self._sync()
+            top = self._tracked.get((by, k))
+            if top is None:
+                scores = self._degree if by == "degree" else {node_id: node_id for node_id in self._degree}
+                top = self._tracked[(by, k)] = TopK(k, scores)
+                while len(self._tracked) > self.max_tracked:
+                    self._tracked.popitem(last=False)
+            else:
+                self._tracked.move_to_end((by, k))
+            ids = top.items()
+        return self.graph_store.subgraph(ids)
+
+    def _sync(self):
+        """Bring degrees and the tracked top-K heaps up to the store's current version."""
+        changes = None
+        if self._version is not None:
+            # Without the whole-graph fallback, which would copy every node and link only to be thrown away
+            changes = self.graph_store.changes_since(self._version, full=False)
+        if changes is None:
+            self._rebuild()
+            return
+
+        # New degrees of the touched nodes; they replace the old ones only once every heap has taken them
+        new_nodes = [node["id"] for node in changes["nodes"] if node["id"] not in self._degree]
+        degrees = dict.fromkeys(new_nodes, 0)
+        for link in changes["links"]:
+            ends = (link["source"], link["target"])
+            if any(node_id not in degrees and node_id not in self._degree for node_id in ends):
+                continue  # Dangling link; only nodes are ranked
+            for node_id in ends:
+                degrees[node_id] = degrees.get(node_id, self._degree[node_id]) + 1
+        for (by, _), top in self._tracked.items():
+            if by == "degree":
+                for node_id, degree in degrees.items():
+                    top.update(node_id, degree)
+            else:
+                for node_id in new_nodes:
+                    top.update(node_id, node_id)
+        for node_id, degree in degrees.items():
+            self._degree[node_id] = degree
+        self._version = changes["version"]
+
+    def _rebuild(self):
+        version, ids, sources, targets = self.graph_store.edge_arrays()
+        self._degree = Counter(dict.fromkeys(ids, 0))
+        for source, target in zip(sources, targets):
+            if source in self._degree and target in self._degree:
+                self._degree[source] += 1
+                self._degree[target] += 1
+        for key in list(self._tracked):
+            by, k = key
+            scores = self._degree if by == "degree" else {node_id: node_id for node_id in self._degree}
+            self._tracked[key] = TopK(k, scores)
+        self._version = version